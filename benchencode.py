@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import subprocess
+import tempfile
+import statistics
+import contextlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from tqdm import tqdm
+
+from encode import convert_library
+from ffmparakeet import ffmpeg_encoders
+from benchutil import peak_rss_bytes, machine_info, write_report, read_report, compare_runs
+
+LIBRARY_SPEC_FILENAME = ".bench_library.json"
+SOURCES = ["sine=frequency={frequency}:sample_rate=44100:duration={duration}", "anoisesrc=color=pink:sample_rate=44100:amplitude=0.3:duration={duration}"]
+
+def parse_list(value: str, cast):
+    return [cast(item.strip()) for item in value.split(",") if item.strip() != ""]
+
+def library_plan(folders: int, files_per_folder: int, durations: list[float], codecs: list[str]):
+    plan = []
+
+    for folder in range(folders):
+        for index in range(files_per_folder):
+            number = folder * files_per_folder + index
+            codec = codecs[number % len(codecs)]
+            duration = durations[number % len(durations)]
+
+            plan.append((Path(f"Folder {folder + 1:02}") / f"Track {index + 1:03}.{codec}", duration, number))
+
+    return plan
+
+def generate_file(root: Path, relative_path: Path, duration: float, number: int):
+    path = root / relative_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    source = SOURCES[number % len(SOURCES)].format(frequency=220 + 20 * (number % 40), duration=duration)
+    codec = ffmpeg_encoders[path.suffix[1:]]
+
+    command = ["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", source, "-ac", "2", "-codec:a", codec,
+               "-metadata", f"title={relative_path.stem}", "-y", str(path)]
+
+    subprocess.run(command, check=True)
+
+def generate_library(root: Path, plan: list, workers: int):
+    spec = [[str(relative_path), duration] for relative_path, duration, _ in plan]
+    spec_path = root / LIBRARY_SPEC_FILENAME
+
+    if spec_path.is_file() and json.loads(spec_path.read_text(encoding="utf-8")) == spec:
+        print(f"Reusing the synthetic library in {root}")
+        return
+
+    if root.exists():
+        shutil.rmtree(root)
+
+    root.mkdir(parents=True)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(generate_file, root, relative_path, duration, number) for relative_path, duration, number in plan]
+
+        for future in tqdm(futures, desc="Generating library", unit="file", ncols=100):
+            future.result()
+
+    spec_path.write_text(json.dumps(spec), encoding="utf-8")
+
+def run_encode(source: Path, workers: int, folder_track_limit: int, filetype: str, batch_size: int):
+    destination = Path(tempfile.mkdtemp(prefix="mparakeet-bench-"))
+
+    try:
+        start_time = time.perf_counter()
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            convert_library(source, destination, workers, folder_track_limit, filetype, batch_size=batch_size)
+
+        wall_time = time.perf_counter() - start_time
+        output_files = sum(1 for path in destination.rglob(f"*.{filetype}") if not path.name.startswith("."))
+    finally:
+        shutil.rmtree(destination, ignore_errors=True)
+
+    return {
+        "wall_time": wall_time,
+        "output_files": output_files,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "ffmpeg_peak_rss_bytes": peak_rss_bytes(children=True)
+    }
+
+def run_isolated(*args):
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as executor:
+        return executor.submit(run_encode, *args).result()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--library", type=str, help="Where the synthetic library is generated and reused")
+    parser.add_argument("--folders", type=int, default=3, help="Number of folders in the synthetic library")
+    parser.add_argument("--files-per-folder", type=int, default=8, help="Number of files per folder")
+    parser.add_argument("--durations", type=str, default="5,30,120", help="Comma-separated track durations in seconds")
+    parser.add_argument("--codecs", type=str, default="mp3,ogg,flac,wav", help="Comma-separated source file types")
+    parser.add_argument("--workers", type=str, default="1,2,4", help="Comma-separated worker counts to benchmark")
+    parser.add_argument("--track-limits", type=str, default="100000,5", help="Comma-separated folder track limits to benchmark")
+    parser.add_argument("--batch-sizes", type=str, default="1", help="Comma-separated ffmpeg batch sizes to benchmark")
+    parser.add_argument("--filetype", type=str, default="mp3", help="Output file type")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per configuration; the median is reported")
+    parser.add_argument("-o", "--output", type=str, help="Write results to a JSON file instead of printing them")
+    parser.add_argument("--compare", type=str, help="Compare files/sec against an earlier results file")
+
+    args = parser.parse_args()
+
+    if shutil.which("ffmpeg") is None:
+        print("ffmpeg was not found")
+        return
+
+    library = Path(args.library) if args.library else Path(tempfile.gettempdir()) / "mparakeet-bench-library"
+    durations = parse_list(args.durations, float)
+    codecs = parse_list(args.codecs, str)
+
+    plan = library_plan(args.folders, args.files_per_folder, durations, codecs)
+    generate_library(library, plan, os.cpu_count() or 1)
+
+    files = len(plan)
+    audio_seconds = sum(duration for _, duration, _ in plan)
+
+    runs = []
+
+    for workers in parse_list(args.workers, int):
+        for folder_track_limit in parse_list(args.track_limits, int):
+            for batch_size in parse_list(args.batch_sizes, int):
+                results = [run_isolated(library, workers, folder_track_limit, args.filetype, batch_size) for _ in range(max(1, args.repeat))]
+                wall_time = statistics.median(result["wall_time"] for result in results)
+
+                run = {
+                    "workers": workers,
+                    "folder_track_limit": folder_track_limit,
+                    "batch_size": batch_size,
+                    "filetype": args.filetype,
+                    "files": files,
+                    "output_files": results[-1]["output_files"],
+                    "audio_seconds": audio_seconds,
+                    "wall_time": wall_time,
+                    "wall_times": [result["wall_time"] for result in results],
+                    "files_per_second": files / wall_time,
+                    "audio_seconds_per_second": audio_seconds / wall_time,
+                    "peak_rss_bytes": max((result["peak_rss_bytes"] or 0) for result in results),
+                    "ffmpeg_peak_rss_bytes": max((result["ffmpeg_peak_rss_bytes"] or 0) for result in results)
+                }
+
+                runs.append(run)
+                print(f"workers={workers} limit={folder_track_limit} batch={batch_size}: {wall_time:.2f}s, "
+                      f"{run['files_per_second']:.2f} files/s, {run['audio_seconds_per_second']:.1f} audio s/s")
+
+    report = {
+        "benchmark": "encode",
+        "machine": machine_info(),
+        "library": {"folders": args.folders, "files_per_folder": args.files_per_folder, "durations": durations, "codecs": codecs},
+        "total_wall_time": sum(sum(run["wall_times"]) for run in runs),
+        "runs": runs
+    }
+
+    write_report(report, Path(args.output) if args.output else None)
+
+    if args.compare:
+        compare_runs(read_report(Path(args.compare)), report, ["workers", "folder_track_limit", "batch_size", "filetype"], "files_per_second")
+
+if __name__ == "__main__":
+    main()
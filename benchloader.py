@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import itertools
+import subprocess
+import contextlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from tqdm import tqdm
+
+from mix import Mix
+from loader import Loader
+from retag import write_mp3_tags
+from fastcopy import copy_file
+from jobdata import ExportJob
+from exportmix import export_tracks, copy_track
+from mixmanifest import write_mix_manifest
+from benchutil import peak_rss_bytes, machine_info, write_report, read_report, compare_runs
+
+LIBRARY_SPEC_FILENAME = ".bench_library.json"
+TEMPLATE_FILENAME = ".template"
+FOLDER_SIZE = 500
+WORDS = ["blue", "night", "river", "electric", "summer", "ghost", "paper", "golden", "falling", "echo",
+         "midnight", "city", "heart", "static", "velvet", "winter", "signal", "neon", "ocean", "silver",
+         "dream", "fire", "glass", "highway", "shadow", "morning", "radio", "wild", "satellite", "honey"]
+RUN_KEYS = ["tracks", "phase", "mix_length", "typo_rate"]
+
+def synthetic_title(rng: random.Random, number: int):
+    artist = " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(1, 2)))
+    title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5)))
+
+    return f"{artist} - {title.capitalize()} {number}"
+
+def library_titles(tracks: int, seed: int):
+    rng = random.Random(seed)
+    return [synthetic_title(rng, number) for number in range(tracks)]
+
+def library_path(root: Path, number: int):
+    return root / f"Folder {number // FOLDER_SIZE:04}" / f"Track {number:06}.mp3"
+
+def write_template(path: Path):
+    command = ["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=440:duration=0.5",
+               "-ac", "1", "-ar", "8000", "-codec:a", "libmp3lame", "-b:a", "8k", "-f", "mp3", "-y", str(path)]
+
+    subprocess.run(command, check=True)
+
+def write_track(template: Path, path: Path, title: str):
+    copy_file(template, path)
+    write_mp3_tags(path, title)
+
+def write_tracks(arguments: list):
+    for template, path, title in arguments:
+        write_track(template, path, title)
+
+def generate_library(root: Path, tracks: int, seed: int, workers: int):
+    spec = {"tracks": tracks, "seed": seed}
+    spec_path = root / LIBRARY_SPEC_FILENAME
+
+    if spec_path.is_file() and json.loads(spec_path.read_text(encoding="utf-8")) == spec:
+        return
+
+    if root.exists():
+        shutil.rmtree(root)
+
+    root.mkdir(parents=True)
+
+    template = root / TEMPLATE_FILENAME
+    write_template(template)
+
+    for folder in range(-(-tracks // FOLDER_SIZE)):
+        (root / f"Folder {folder:04}").mkdir()
+
+    arguments = [(template, library_path(root, number), title) for number, title in enumerate(library_titles(tracks, seed))]
+    chunks = list(itertools.batched(arguments, 250))
+
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        for _ in tqdm(executor.map(write_tracks, chunks), total=len(chunks), desc=f"Generating {tracks} tracks", unit="chunk", ncols=100):
+            pass
+
+    spec_path.write_text(json.dumps(spec), encoding="utf-8")
+
+def add_typos(rng: random.Random, text: str, typo_rate: float):
+    characters = []
+
+    for character in text:
+        roll = rng.random()
+
+        if roll >= typo_rate:
+            characters.append(character)
+        elif roll < typo_rate / 3:
+            continue
+        elif roll < typo_rate * 2 / 3:
+            characters.append(rng.choice("abcdefghijklmnopqrstuvwxyz"))
+        else:
+            characters.extend([character, character])
+
+    return "".join(characters)
+
+def timed(function, *args, **kwargs):
+    start_time = time.perf_counter()
+    result = function(*args, **kwargs)
+
+    return result, time.perf_counter() - start_time
+
+def quiet_load_mix(loader: Loader, path: Path):
+    mix = Mix(mix_title=path.stem)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        loader.load_mix(path, mix, confirm=False)
+
+    return mix
+
+def run_library(library: Path, tracks: int, seed: int, scan_workers: int, mix_lengths: list[int], typo_rates: list[float], directory_mix_length: int):
+    work = Path(tempfile.mkdtemp(prefix="mparakeet-bench-"))
+    runs = []
+
+    def record(phase: str, seconds: float, **fields):
+        runs.append({"tracks": tracks, "phase": phase, "mix_length": None, "typo_rate": None,
+                     "seconds": seconds, "peak_rss_bytes": peak_rss_bytes(), **fields})
+
+    try:
+        output = work / "output"
+
+        _, seconds = timed(Loader, library, output, scan_workers=scan_workers)
+        record("loader_cold", seconds)
+
+        loader, seconds = timed(Loader, library, output, scan_workers=scan_workers)
+        record("loader_warm", seconds)
+
+        _, seconds = timed(loader.get_title_index)
+        record("title_index", seconds)
+
+        rng = random.Random(seed)
+
+        for mix_length in mix_lengths:
+            expected = [rng.choice(loader.audio_files) for _ in range(mix_length)]
+
+            for typo_rate in typo_rates:
+                mix_path = work / f"mix {mix_length} {typo_rate}.txt"
+                mix_path.write_text("".join(f"{add_typos(rng, track.title, typo_rate)}\n" for track in expected), encoding="utf-8")
+
+                mix, seconds = timed(quiet_load_mix, loader, mix_path)
+                matched = sum(1 for loaded, track in zip(mix.get_tracks(), expected) if loaded == track)
+
+                record("text_mix", seconds, mix_length=mix_length, typo_rate=typo_rate, accuracy=matched / mix_length)
+
+        directory_tracks = rng.sample(loader.audio_files, min(directory_mix_length, len(loader.audio_files)))
+        mix_directory = work / "directory mix"
+
+        jobs = [ExportJob(source_path=Path(track.path), destination_path=mix_directory / Path(track.path).name, track_num=number, album="Bench")
+                for number, track in enumerate(directory_tracks, start=1)]
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stderr(devnull):
+            export_tracks(jobs, workers=scan_workers, export=copy_track)
+
+        mix, seconds = timed(quiet_load_mix, loader, mix_directory)
+        record("directory_mix", seconds, mix_length=len(jobs), accuracy=sum(1 for a, b in zip(mix.get_tracks(), directory_tracks) if a == b) / max(1, len(jobs)))
+
+        write_mix_manifest(mix_directory, [{"file": job.destination_path.name, "source": track.path} for job, track in zip(jobs, directory_tracks)])
+
+        mix, seconds = timed(quiet_load_mix, loader, mix_directory)
+        record("directory_mix_manifest", seconds, mix_length=len(jobs), accuracy=sum(1 for a, b in zip(mix.get_tracks(), directory_tracks) if a == b) / max(1, len(jobs)))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    return runs
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--library", type=str, help="Where synthetic libraries are generated and reused")
+    parser.add_argument("--sizes", type=str, default="1000,10000,100000", help="Comma-separated library sizes")
+    parser.add_argument("--mix-lengths", type=str, default="20,200", help="Comma-separated text mix lengths")
+    parser.add_argument("--typo-rates", type=str, default="0,0.05,0.2", help="Comma-separated per-character typo rates for text mixes")
+    parser.add_argument("--directory-mix-length", type=int, default=100, help="Tracks in the exported directory mix")
+    parser.add_argument("-w", "--scan-workers", type=int, default=1, help="The number of processes used to scan the library")
+    parser.add_argument("--seed", type=int, default=3, help="Seed for titles, mixes and typos")
+    parser.add_argument("-b", "--baseline", type=str, help="Baseline results file to check for regressions")
+    parser.add_argument("-u", "--update-baseline", action="store_true", help="Write the results to the baseline file instead of checking them")
+    parser.add_argument("-t", "--threshold", type=float, default=0.25, help="Allowed slowdown against the baseline, as a fraction")
+    parser.add_argument("-o", "--output", type=str, help="Write results to a JSON file instead of printing them")
+
+    args = parser.parse_args()
+
+    if shutil.which("ffmpeg") is None:
+        print("ffmpeg was not found")
+        return
+
+    library_root = Path(args.library) if args.library else Path(tempfile.gettempdir()) / "mparakeet-bench-loader"
+    mix_lengths = [int(value) for value in args.mix_lengths.split(",")]
+    typo_rates = [float(value) for value in args.typo_rates.split(",")]
+
+    runs = []
+
+    for tracks in [int(value) for value in args.sizes.split(",")]:
+        library = library_root / f"{tracks} tracks"
+        generate_library(library, tracks, args.seed, os.cpu_count() or 1)
+
+        with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as executor:
+            library_runs = executor.submit(run_library, library, tracks, args.seed, args.scan_workers, mix_lengths, typo_rates, args.directory_mix_length).result()
+
+        for run in library_runs:
+            details = "".join(f" {key}={run[key]}" for key in ("mix_length", "typo_rate", "accuracy") if run.get(key) is not None)
+            print(f"{tracks} tracks {run['phase']}{details}: {run['seconds']:.3f}s, {(run['peak_rss_bytes'] or 0) / 1_000_000:.0f} MB peak")
+
+        runs.extend(library_runs)
+
+    report = {
+        "benchmark": "loader",
+        "machine": machine_info(),
+        "scan_workers": args.scan_workers,
+        "seed": args.seed,
+        "runs": runs
+    }
+
+    if args.baseline and args.update_baseline:
+        write_report(report, Path(args.baseline))
+        return
+
+    write_report(report, Path(args.output) if args.output else None)
+
+    if args.baseline:
+        regressions = compare_runs(read_report(Path(args.baseline)), report, RUN_KEYS, "seconds", higher_is_better=False, threshold=args.threshold)
+
+        if len(regressions) > 0:
+            print(f"{len(regressions)} run(s) are more than {args.threshold:.0%} slower than the baseline")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
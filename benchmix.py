@@ -0,0 +1,156 @@
+import io
+import sys
+import time
+import random
+import argparse
+import contextlib
+from pathlib import Path
+
+from mix import Mix
+from track import Track
+from benchutil import peak_rss_bytes, machine_info, write_report, read_report, compare_runs
+
+LAYOUTS = ["plain", "groups", "breaks", "groups+breaks"]
+OPERATIONS = ["move_track", "swap_tracks", "group_tracks", "remove_track", "add_track_or_break", "track_names", "display"]
+RUN_KEYS = ["entries", "layout", "operation"]
+BREAK_EVERY = 12
+
+class BenchMix(Mix):
+    def __init__(self, mix_title, rng: random.Random):
+        super().__init__(mix_title)
+        self.rng = rng
+
+    def confirm_group_insert(self, move_track, move_to_track):
+        return self.rng.random() < 0.5
+
+def synthetic_track(rng: random.Random, number: int):
+    return Track(title=f"Track {number} {'x' * rng.randint(0, 40)}", path=f"/bench/{number}.mp3", length=rng.uniform(60, 600))
+
+def build_mix(entries: int, layout: str, rng: random.Random):
+    mix = BenchMix(mix_title="Bench", rng=rng)
+
+    for number in range(entries):
+        if "breaks" in layout and number % BREAK_EVERY == BREAK_EVERY - 1:
+            mix.add_track_or_break(f".break {rng.randint(20, 45)}:00")
+        else:
+            mix.add_track_or_break(synthetic_track(rng, number))
+
+    if "groups" in layout:
+        for _ in range(entries // 10):
+            first = rng.randrange(mix.track_count())
+            mix.group_tracks(first, min(mix.track_count() - 1, first + rng.randint(1, 3)))
+
+    return mix
+
+def run_operation(mix: BenchMix, operation: str, rng: random.Random, number: int):
+    count = mix.track_count()
+
+    if operation == "move_track":
+        mix.move_track(from_index=rng.randrange(count), to_index=rng.randrange(count + 1))
+    elif operation == "swap_tracks":
+        mix.swap_tracks(rng.randrange(count), rng.randrange(count))
+    elif operation == "group_tracks":
+        mix.group_tracks(rng.randrange(count), rng.randrange(count))
+    elif operation == "remove_track":
+        mix.remove_track(rng.randrange(count))
+        mix.add_track_or_break(synthetic_track(rng, number))
+    elif operation == "add_track_or_break":
+        mix.add_track_or_break(synthetic_track(rng, number))
+        mix.remove_track(mix.track_count() - 1)
+    elif operation == "track_names":
+        mix.track_names(include_indices=True)
+    elif operation == "display":
+        with contextlib.redirect_stdout(io.StringIO()):
+            mix.display(rng.randrange(mix.page_count()))
+
+def percentile(samples: list[float], fraction: float):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def bench_layout(entries: int, layout: str, operations: list[str], repeats: int, seed: int):
+    rng = random.Random(seed)
+
+    start_time = time.perf_counter()
+    mix = build_mix(entries, layout, rng)
+    build_time = time.perf_counter() - start_time
+
+    samples = {operation: [] for operation in operations}
+    sequence = [operation for operation in operations for _ in range(repeats)]
+    rng.shuffle(sequence)
+
+    for number, operation in enumerate(sequence, start=entries):
+        start_time = time.perf_counter()
+        run_operation(mix, operation, rng, number)
+        samples[operation].append(time.perf_counter() - start_time)
+
+    runs = []
+
+    for operation in operations:
+        times = samples[operation]
+
+        runs.append({
+            "entries": entries,
+            "layout": layout,
+            "operation": operation,
+            "samples": len(times),
+            "build_seconds": build_time,
+            "p50_ms": percentile(times, 0.5) * 1000,
+            "p90_ms": percentile(times, 0.9) * 1000,
+            "p99_ms": percentile(times, 0.99) * 1000,
+            "max_ms": max(times) * 1000
+        })
+
+    return runs
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=str, default="100,1000,10000,50000", help="Comma-separated mix sizes")
+    parser.add_argument("--layouts", type=str, default=",".join(LAYOUTS), help=f"Comma-separated layouts: {', '.join(LAYOUTS)}")
+    parser.add_argument("--operations", type=str, default=",".join(OPERATIONS), help="Comma-separated operations to time")
+    parser.add_argument("-r", "--repeats", type=int, default=200, help="Samples per operation")
+    parser.add_argument("--seed", type=int, default=3, help="Seed for mixes and edits")
+    parser.add_argument("--interactive-ms", type=float, default=50, help="Flag operations whose p99 latency is above this")
+    parser.add_argument("-b", "--baseline", type=str, help="Baseline results file to check for regressions")
+    parser.add_argument("-u", "--update-baseline", action="store_true", help="Write the results to the baseline file instead of checking them")
+    parser.add_argument("-t", "--threshold", type=float, default=0.5, help="Allowed p99 slowdown against the baseline, as a fraction")
+    parser.add_argument("-o", "--output", type=str, help="Write results to a JSON file instead of printing them")
+
+    args = parser.parse_args()
+
+    operations = [operation for operation in args.operations.split(",") if operation in OPERATIONS]
+    layouts = [layout for layout in args.layouts.split(",") if layout in LAYOUTS]
+
+    runs = []
+
+    for entries in [int(value) for value in args.sizes.split(",")]:
+        for layout in layouts:
+            for run in bench_layout(entries, layout, operations, args.repeats, args.seed):
+                slow = " (not interactive)" if run["p99_ms"] > args.interactive_ms else ""
+                print(f"{entries:>6} {layout:<14} {run['operation']:<19} p50 {run['p50_ms']:8.3f}ms  p90 {run['p90_ms']:8.3f}ms  p99 {run['p99_ms']:8.3f}ms{slow}")
+
+                runs.append(run)
+
+    report = {
+        "benchmark": "mix",
+        "machine": machine_info(),
+        "repeats": args.repeats,
+        "seed": args.seed,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "runs": runs
+    }
+
+    if args.baseline and args.update_baseline:
+        write_report(report, Path(args.baseline))
+        return
+
+    write_report(report, Path(args.output) if args.output else None)
+
+    if args.baseline:
+        regressions = compare_runs(read_report(Path(args.baseline)), report, RUN_KEYS, "p99_ms", higher_is_better=False, threshold=args.threshold)
+
+        if len(regressions) > 0:
+            print(f"{len(regressions)} operation(s) are more than {args.threshold:.0%} slower than the baseline")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import shutil
+import platform
+import subprocess
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def peak_rss_bytes(children: bool = False):
+    if resource is None:
+        return None
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+def ffmpeg_version():
+    if shutil.which("ffmpeg") is None:
+        return None
+
+    return subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True).stdout.split("\n")[0]
+
+def machine_info():
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "ffmpeg": ffmpeg_version()
+    }
+
+def write_report(report: dict, report_path: Path | None = None):
+    text = json.dumps(report, indent=1)
+
+    if report_path is None:
+        print(text)
+    else:
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report_path.write_text(text, encoding="utf-8")
+        print(f"Wrote results to {report_path}")
+
+def read_report(report_path: Path):
+    with open(report_path, encoding="utf-8") as file:
+        return json.load(file)
+
+def compare_runs(baseline: dict, current: dict, key_fields: list[str], metric: str, higher_is_better: bool = True, threshold: float | None = None):
+    def run_key(run):
+        return tuple(run.get(field) for field in key_fields)
+
+    baseline_runs = {run_key(run): run for run in baseline.get("runs", [])}
+    regressions = []
+
+    for run in current.get("runs", []):
+        previous = baseline_runs.get(run_key(run))
+
+        if previous is None or not previous.get(metric) or run.get(metric) is None:
+            continue
+
+        change = run[metric] / previous[metric] - 1
+        regressed = threshold is not None and (change < -threshold if higher_is_better else change > threshold)
+
+        label = ", ".join(f"{field}={value}" for field, value in zip(key_fields, run_key(run)))
+        print(f"{label}: {metric} {previous[metric]:.3f} -> {run[metric]:.3f} ({change:+.1%}){' REGRESSION' if regressed else ''}")
+
+        if regressed:
+            regressions.append(run)
+
+    return regressions
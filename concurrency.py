@@ -0,0 +1,122 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+AUTO = "auto"
+
+def available_cpus():
+    if hasattr(os, "process_cpu_count"):
+        return os.process_cpu_count() or 1
+
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+
+    return os.cpu_count() or 1
+
+def resolve_workers(max_threads):
+    if max_threads is None:
+        return 1
+
+    if str(max_threads).strip().lower() == AUTO:
+        return available_cpus()
+
+    return max(1, int(max_threads))
+
+def ffmpeg_threads(workers: int):
+    return max(1, available_cpus() // max(1, workers))
+
+def read_cpu_times():
+    try:
+        with open("/proc/stat", encoding="utf-8") as file:
+            fields = file.readline().split()
+    except OSError:
+        return None
+
+    if len(fields) < 6 or fields[0] != "cpu":
+        return None
+
+    values = [int(value) for value in fields[1:]]
+
+    return sum(values), values[4]
+
+def load_per_cpu():
+    try:
+        return os.getloadavg()[0] / available_cpus()
+    except (AttributeError, OSError):
+        return None
+
+class LoadThrottle:
+    def __init__(self, max_load: float | None = None, max_iowait: float | None = None, interval: float = 1.0):
+        self.max_load = max_load
+        self.max_iowait = max_iowait
+        self.interval = interval
+        self.condition = threading.Condition()
+        self.active = 0
+        self.waited = 0.0
+        self.last_sample = None
+        self.last_sample_time = 0.0
+        self.iowait = None
+
+    def enabled(self):
+        return self.max_load is not None or self.max_iowait is not None
+
+    def sample_iowait(self):
+        now = time.monotonic()
+
+        if self.last_sample is not None and now - self.last_sample_time < self.interval:
+            return self.iowait
+
+        sample = read_cpu_times()
+
+        if sample is not None and self.last_sample is not None:
+            total = sample[0] - self.last_sample[0]
+            self.iowait = (sample[1] - self.last_sample[1]) / total if total > 0 else 0.0
+
+        self.last_sample = sample
+        self.last_sample_time = now
+
+        return self.iowait
+
+    def overloaded(self):
+        if self.max_load is not None:
+            load = load_per_cpu()
+
+            if load is not None and load > self.max_load:
+                return True
+
+        if self.max_iowait is not None:
+            iowait = self.sample_iowait()
+
+            if iowait is not None and iowait > self.max_iowait:
+                return True
+
+        return False
+
+    @contextmanager
+    def slot(self):
+        if self.enabled():
+            with self.condition:
+                started = time.perf_counter()
+                held_back = False
+
+                while self.active > 0 and self.overloaded():
+                    held_back = True
+                    self.condition.wait(self.interval)
+
+                if held_back:
+                    self.waited += time.perf_counter() - started
+
+                self.active += 1
+
+        try:
+            yield
+        finally:
+            if self.enabled():
+                with self.condition:
+                    self.active -= 1
+                    self.condition.notify_all()
+
+    def run(self, function, *args, **kwargs):
+        with self.slot():
+            return function(*args, **kwargs)
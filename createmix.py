@@ -1,15 +1,26 @@
 import time
 import argparse
+import subprocess
 import pathvalidate
 
 from pathlib import Path
-from pyfzf.pyfzf import FzfPrompt
 
-from mix import Mix
+from mix import Mix, BREAKS, side_name, format_duration
+from picker import FzfPicker
+from track import Track
 from loader import Loader
+from watcher import LibraryWatcher
+from preview import TransitionPreviews, PREVIEW_DIRNAME
 from ottlog import logger
-from sconfig import parse_config_with_defaults
-from ffmparakeet import run_ffmpeg
+from metrics import metrics
+from sconfig import parse_config_with_defaults, to_bool
+from jobdata import ExportJob
+from exportmix import export_tracks, export_functions, EXPORT_MODES
+from mixmanifest import write_mix_manifest
+from filecache import default_cache_path
+from loudness import analyse_files, normalization_gain, TARGET_LOUDNESS
+from silence import index_silence, trimmed_length
+from sidepacker import pack_mix
 
 from colorama import Fore
 from colorama import Style
@@ -17,6 +28,7 @@ from colorama import Style
 EXIT = ".exit"
 VIEW = ".mix"
 ADD_BREAK = ".add_break"
+PACK_SIDES = ".pack_sides"
 EXPORT_TO_TXT = ".write_to_txt"
 COPY_FILES = ".export_mix"
 
@@ -28,15 +40,36 @@ def main():
     parser.add_argument("-s", "--search", type=str, help="Search from directory")
     parser.add_argument("-o", "--output", type=str, help="Output to directory")
     parser.add_argument("-n", "--name", type=str, help="Mix name")
+    parser.add_argument("-w", "--scan-workers", type=int, help="The number of processes used to scan the library")
+    parser.add_argument("-e", "--export-workers", type=int, help="The number of tracks exported at once")
+    parser.add_argument("-m", "--export-mode", type=str, choices=EXPORT_MODES, help="Re-encode exported tracks or copy them and rewrite their tags")
+    parser.add_argument("-b", "--batch-size", type=int, help="Encode up to this many small tracks per ffmpeg process")
+    parser.add_argument("-p", "--preview-length", type=float, help="Seconds of each track played in a transition preview")
+    parser.add_argument("-x", "--crossfade", type=float, help="Seconds the tracks overlap in a transition preview")
+    parser.add_argument("--normalize", action=argparse.BooleanOptionalAction, default=None, help="Bring exported tracks to the target loudness, or tag them with ReplayGain in copy mode")
+    parser.add_argument("--target-loudness", type=float, help="Integrated loudness in LUFS that exported tracks are brought to")
+    parser.add_argument("--trim-silence", action=argparse.BooleanOptionalAction, default=None, help="Leave leading and trailing silence out of the lengths shown for tracks and sides")
+    parser.add_argument("--watch", action=argparse.BooleanOptionalAction, default=None, help="Pick up tracks added, changed or removed in the search directory while the editor is open")
+    parser.add_argument("--metrics", type=str, help="Write timings and counters to this file at exit, as Prometheus text if it ends in .prom and JSON otherwise")
 
     args = parser.parse_args()
 
     search = args.search
     output = args.output
 
-    config = parse_config_with_defaults(section="mix", params=[("search", str, search), ("output", str, output)])
+    config = parse_config_with_defaults(section="mix", params=[("search", str, search), ("output", str, output), ("scanworkers", int, args.scan_workers), ("exportworkers", int, args.export_workers), ("exportmode", str, args.export_mode), ("batchsize", int, args.batch_size), ("metrics", str, args.metrics), ("watch", to_bool, args.watch), ("previewlength", float, args.preview_length), ("crossfade", float, args.crossfade), ("normalize", to_bool, args.normalize), ("targetloudness", float, args.target_loudness), ("trimsilence", to_bool, args.trim_silence)])
     search, output = config["search"], config["output"]
 
+    metrics.export_at_exit(config["metrics"], "createmix")
+
+    scan_workers = 1 if config["scanworkers"] is None else max(1, config["scanworkers"])
+    export_workers = 1 if config["exportworkers"] is None else max(1, config["exportworkers"])
+    batch_size = 1 if config["batchsize"] is None else max(1, config["batchsize"])
+    preview_length = 10 if config["previewlength"] is None else max(1, config["previewlength"])
+    crossfade = 0 if config["crossfade"] is None else max(0, config["crossfade"])
+    export_mode = "encode" if config["exportmode"] not in EXPORT_MODES else config["exportmode"]
+    target_loudness = None if config["normalize"] is not True else TARGET_LOUDNESS if config["targetloudness"] is None else config["targetloudness"]
+
     while search is None or not Path(search).is_dir():
         search = input("Search: ").strip('"')
 
@@ -50,7 +83,7 @@ def main():
         logger.error(f"Search directory {Fore.YELLOW}{search}{Style.RESET_ALL} does not exist")
         return
 
-    loader = Loader(search, output)
+    loader = Loader(search, output, scan_workers=scan_workers)
 
     mix_title = ""
 
@@ -60,6 +93,7 @@ def main():
         mix_title = Path(args.load_mix).stem
 
     mix = Mix(mix_title=mix_title)
+    mix.show_trimmed = config["trimsilence"] is True
 
     if args.load_mix is not None:
         loader.load_mix(Path(args.load_mix), mix)
@@ -75,62 +109,127 @@ def main():
 
     ################################## Mix Editor ##################################
 
-    options = [*loader.file_names, VIEW, ADD_BREAK, EXPORT_TO_TXT, COPY_FILES, EXIT]
-    fzf = FzfPrompt()
+    picker = FzfPicker(menu_entries(loader))
+    watcher = LibraryWatcher(search) if config["watch"] is True else None
+    cache_path = default_cache_path()
+    previews = TransitionPreviews(output / PREVIEW_DIRNAME, preview_length=preview_length, crossfade=crossfade, silence_cache=cache_path)
+
+    selections = picker.selections()
+
+    try:
+        for selection in selections:
+            for selected in selection:
+                if selected == VIEW:
+                    if mix.show_trimmed:
+                        update_trimmed_lengths(mix, cache_path, workers=scan_workers)
+
+                    view(mix, previews)
+                elif selected == ADD_BREAK:
+                    add_break(mix)
+                elif selected == PACK_SIDES:
+                    if mix.show_trimmed:
+                        update_trimmed_lengths(mix, cache_path, workers=scan_workers)
+
+                    pack_sides(mix)
+                elif selected == EXPORT_TO_TXT:
+                    export_to_txt(output, mix_title, mix)
+                elif selected == COPY_FILES:
+                    copy_files(output, mix_title, mix, workers=export_workers, mode=export_mode, batch_size=batch_size, target_loudness=target_loudness)
+                    return
+                elif selected == EXIT:
+                    return
+                elif selected in loader.file_name_to_audio_file:
+                    mix.add_track_or_break(loader.file_name_to_audio_file[selected])
+
+            if watcher is not None:
+                refresh_library(loader, watcher, picker)
+    finally:
+        selections.close()
+        picker.close()
+        previews.close()
+
+        if watcher is not None:
+            watcher.stop()
 
-    while True:
-        selected = fzf.prompt(options, '--cycle')
+    ##############################################################################
 
-        if len(selected) != 1:
-            continue
+def menu_entries(loader: Loader):
+    return [*loader.file_names, VIEW, ADD_BREAK, PACK_SIDES, EXPORT_TO_TXT, COPY_FILES, EXIT]
 
-        selected = selected[0]
+def refresh_library(loader: Loader, watcher: LibraryWatcher, picker: FzfPicker):
+    changes = watcher.drain()
 
-        if selected == VIEW:
-            view(mix)
-            continue
-        elif selected == ADD_BREAK:
-            add_break(mix)
-            continue
-        elif selected == EXPORT_TO_TXT:
-            export_to_txt(output, mix_title, mix)
-            continue
-        elif selected == COPY_FILES:
-            copy_files(output, mix_title, mix)
-            break
-        elif selected == EXIT:
-            return
+    if len(changes) <= 0:
+        return
 
-        selected = loader.file_name_to_audio_file[selected]
-        mix.add_track_or_break(selected)
+    updated, removed = loader.apply_changes(changes)
+    picker.update(menu_entries(loader))
 
-    ##############################################################################
+    print(f"Library updated: {Fore.GREEN}{updated}{Style.RESET_ALL} added or changed, {Fore.RED}{removed}{Style.RESET_ALL} removed")
+
+def update_trimmed_lengths(mix: Mix, cache_path: Path, workers=1):
+    tracks = {track.path: track for track in mix.get_tracks() if isinstance(track, Track)}
+    bounds = index_silence([Path(path) for path in tracks], cache_path, workers=workers)
+
+    mix.set_trimmed_lengths({path: trimmed_length(bounds.get(Path(path)), track.length) for path, track in tracks.items()})
+
+def neighbouring_track(mix: Mix, track_index, step):
+    track_index += step
+
+    while 0 <= track_index < mix.track_count():
+        track = mix.track_at(track_index)
 
-def view(mix: Mix):
+        if isinstance(track, Track):
+            return track
+
+        track_index += step
+
+    return None
+
+def prefetch_transitions(mix: Mix, previews: TransitionPreviews, track_index):
+    track = mix.track_at(track_index)
+
+    if not isinstance(track, Track):
+        return
+
+    previous_track = neighbouring_track(mix, track_index, -1)
+    next_track = neighbouring_track(mix, track_index, 1)
+
+    previews.prefetch([pair for pair in ((track, next_track), (previous_track, track)) if None not in pair])
+
+def view(mix: Mix, previews: TransitionPreviews):
     print("\n" * 100)
 
+    page = 0
+
     while True:
-        mix.display()
+        page = min(page, mix.page_count() - 1)
+        mix.display(page)
 
-        selection, first_track_index = mix.prompt_track_selection()
+        selection, first_track_index = mix.prompt_track_selection(allow_paging=True)
 
         if selection == "e":
             return
+        elif selection == "n" or selection == "p":
+            page = (page + (1 if selection == "n" else -1)) % mix.page_count()
+            print("\n" * 100)
+            continue
 
-        if not isinstance(selection, MP3):
+        if not isinstance(selection, Track):
             selected_track_title = "break"
         else:
-            selected_track_title = selection.get('Title', Path(selection.filename).stem)[0]
+            selected_track_title = selection.title
+            prefetch_transitions(mix, previews, first_track_index)
 
         print(f"\nSelecting {Fore.GREEN}{selected_track_title}{Style.RESET_ALL}")
 
         song_action = ""
 
-        options = ["m", "s", "g", "p", "t", "r", "e"] if isinstance(selection, MP3) else ["m", "s", "g", "r", "e"]
+        options = ["m", "s", "g", "p", "t", "r", "e"] if isinstance(selection, Track) else ["m", "s", "g", "r", "e"]
 
         while song_action not in options:
             try:
-                if isinstance(selection, MP3):
+                if isinstance(selection, Track):
                     song_action = input(f"[M]ove, [S]wap, [G]roup, [P]lay, Preview [T]ransition, [R]emove From Mix, or [E]xit: ").lower()
                 else:
                     song_action = input("[M]ove, [S]wap, [G]roup, [R]emove From Mix, or [E]xit: ").lower()
@@ -159,10 +258,10 @@ def view(mix: Mix):
             if song_action == "m":
                 action_message = f"Moved {selected_track_title} to {second_track_index + 1}"
             elif song_action == "s":
-                if not isinstance(second_track, MP3):
+                if not isinstance(second_track, Track):
                     second_track_title = "break"
                 else:
-                    second_track_title = second_track.get('Title', Path(second_track.filename).stem)[0]
+                    second_track_title = second_track.title
 
                 action_message = f"Swapped {selected_track_title} with {second_track_title}"
         elif song_action == "g":
@@ -173,27 +272,19 @@ def view(mix: Mix):
 
             mix.group_tracks(first_track_index, second_track_index)
 
-            if not isinstance(second_track, MP3):
+            if not isinstance(second_track, Track):
                 second_track_title = "break"
             else:
-                second_track_title = second_track.get('Title', Path(second_track.filename).stem)[0]
+                second_track_title = second_track.title
 
             action_message = f"Grouped {selected_track_title} with {second_track_title}"
         elif song_action == "p":
-            play_song(selection.filename)
+            play_song(selection.path)
         elif song_action == "t":
-            selected_song_path = selection.filename
-
-            next_song_index = first_track_index + 1
-            next_song = None
-
-            while next_song_index < mix.track_count() and not isinstance(next_song, MP3):
-                next_song = mix.get_tracks()[next_song_index]
-                next_song_index += 1
+            next_song = neighbouring_track(mix, first_track_index, 1)
 
             if next_song is not None:
-                next_song_path = next_song.filename
-                preview_transition(selected_song_path, next_song_path, preview_length=10)
+                preview_transition(previews, selection, next_song)
         elif song_action == "r":
             mix.remove_track(first_track_index)
             action_message = f"Removed {selected_track_title} from the mix"
@@ -223,6 +314,31 @@ def add_break(mix):
         except:
             pass
 
+def pack_sides(mix):
+    if mix.track_groups.summary()[BREAKS] <= 0:
+        input("Add a break for each side before packing. Press enter to continue ")
+        return
+
+    ok = input("Reorder the mix so each side fits under its break with as little unused time as possible? (y/n): ")
+
+    if ok.lower() != "y":
+        return
+
+    start_time = time.perf_counter()
+
+    try:
+        unused, leftover = pack_mix(mix)
+    except ValueError as e:
+        input(f"{Fore.RED}Couldn't pack sides{Style.RESET_ALL}: {e}\nPress enter to continue ")
+        return
+
+    for section_num, unused_time in enumerate(unused):
+        print(f"{side_name(section_num)} Side: {Fore.GREEN}{format_duration(unused_time)}{Style.RESET_ALL} unused")
+
+    leftover_info = f", {Fore.RED}{leftover}{Style.RESET_ALL} track(s) didn't fit and were moved after the last break" if leftover > 0 else ""
+
+    input(f"Packed sides in {time.perf_counter() - start_time:.2f}s{leftover_info}. Press enter to continue ")
+
 def export_to_txt(output, mix_title, mix):
     output_mix_path = output
     output_mix_path.mkdir(parents=True, exist_ok=True)
@@ -231,8 +347,8 @@ def export_to_txt(output, mix_title, mix):
 
     with open(filepath, "w", encoding="utf-8") as file:
         for track in mix.get_tracks():
-            if isinstance(track, MP3):
-                track_title = track.get('Title', Path(track.filename).stem)[0]
+            if isinstance(track, Track):
+                track_title = track.title
                 print(track_title)
                 file.write(f"{track_title}\n")
             elif isinstance(track, str):
@@ -240,19 +356,54 @@ def export_to_txt(output, mix_title, mix):
 
     input(f"Wrote to {Fore.YELLOW}{filepath}{Style.RESET_ALL}, press enter to continue ")
 
-def copy_files(output, mix_title, mix):
+def copy_files(output, mix_title, mix, workers=1, mode="encode", batch_size=1, target_loudness=None):
     output_mix_path = output / mix_title
     output_mix_path.mkdir(parents=True, exist_ok=True)
 
-    for i, file in enumerate(mix.get_tracks()):
-        filepath = Path(file.filename)
-        output_path = output_mix_path / filepath.name
-        run_ffmpeg(track_num=i + 1, album=mix_title, source=filepath, destination=output_path)
+    manifest_entries = []
+    jobs = []
+    used_names = set()
+    loudness = {}
+
+    if target_loudness is not None:
+        loudness = analyse_files(sorted({Path(track.path) for track in mix.get_tracks() if isinstance(track, Track)}), default_cache_path(), workers=workers)
+
+    for file in mix.get_tracks():
+        if not isinstance(file, Track):
+            manifest_entries.append(({"break": file}, None))
+            continue
+
+        filepath = Path(file.path)
+        output_name = filepath.name
+        duplicate_number = 1
+
+        while output_name.lower() in used_names:
+            duplicate_number += 1
+            output_name = f"{filepath.stem} ({duplicate_number}){filepath.suffix}"
+
+        used_names.add(output_name.lower())
+
+        job = ExportJob(source_path=filepath, destination_path=output_mix_path / output_name, track_num=len(jobs) + 1, album=mix_title, gain_db=normalization_gain(loudness.get(filepath), target_loudness))
+        jobs.append(job)
+
+        manifest_entries.append(({"file": output_name, "source": file.path}, job))
+
+    failures, exported_bytes, wall_time = export_tracks(jobs, workers=workers, export=export_functions[mode], batch_size=batch_size)
+    failed_jobs = {job for job, _ in failures}
+
+    write_mix_manifest(output_mix_path, [entry for entry, job in manifest_entries if job not in failed_jobs])
+
+    exported_count = len(jobs) - len(failures)
+
+    print(f"Exported {exported_count} track(s) in {wall_time:.1f}s "
+          f"({exported_count / max(wall_time, 1e-9):.2f} tracks/s, {exported_bytes / 1_000_000 / max(wall_time, 1e-9):.1f} MB/s)")
+
+    for job, error in failures:
+        print(f"{Fore.RED}Failed to export{Style.RESET_ALL} {Fore.YELLOW}{job.source_path}{Style.RESET_ALL}: {error}")
 
     input(f"Copied tracks to {Fore.YELLOW}{output_mix_path}{Style.RESET_ALL}, press enter to continue ")
 
 import vlc
-from mutagen.mp3 import MP3
 
 def play_song(song_path):
     player = vlc.MediaPlayer(song_path)
@@ -263,28 +414,16 @@ def play_song(song_path):
     input("Press enter to stop playback ")
     player.stop()
 
-def preview_transition(song_ending_path, song_starting_path, preview_length=1):
-    song_ending = MP3(song_ending_path)
-    song_ending_length = song_ending.info.length
-
-    start_song_ending_at = max(0, song_ending_length - preview_length)
-
-    song_ending_player = vlc.MediaPlayer(song_ending_path)
-    song_starting_player = vlc.MediaPlayer(song_starting_path)
+def preview_transition(previews: TransitionPreviews, song_ending: Track, song_starting: Track):
+    print("Rendering preview...")
 
-    print("Playing preview...")
-    song_ending_player.play()
-
-    time.sleep(0.1)
-
-    song_ending_player.set_time(int(start_song_ending_at * 1000))
-
-    time.sleep(preview_length + 0.1)
-
-    song_starting_player.play()
+    try:
+        clip = previews.get(song_ending, song_starting)
+    except (subprocess.CalledProcessError, OSError) as e:
+        input(f"{Fore.RED}Couldn't render the preview{Style.RESET_ALL}: {e}\nPress enter to continue ")
+        return
 
-    input("Press enter to stop playback ")
-    song_starting_player.stop()
+    play_song(str(clip))
 
 if __name__ == "__main__":
     main()
@@ -5,12 +5,15 @@ import time
 
 from pathlib import Path
 
+from metrics import metrics
+
 def download_playlist():
     parser = argparse.ArgumentParser()
     parser.add_argument("-l", "--link", type=str, help="Playlist link. Required")
     parser.add_argument("-o", "--output", type=str, help="Output directory. Required")
     parser.add_argument("-f", "--filetype", type=str, help="The format of the output files. Default: mp3")
     parser.add_argument("-q", "--quiet", type=bool, help="Whether the downloader doesn't print logs. Default: True")
+    parser.add_argument("--metrics", type=str, help="Write timings and counters to this file at exit, as Prometheus text if it ends in .prom and JSON otherwise")
 
     args = parser.parse_args()
 
@@ -19,6 +22,8 @@ def download_playlist():
     filetype = args.filetype
     quiet = args.quiet
 
+    metrics.export_at_exit(args.metrics, "downloadplaylist")
+
     while link is None:
         link = input("Playlist link: ")
 
@@ -46,7 +51,8 @@ def download_playlist():
         "quiet": quiet,
         "no_warnings": quiet,
         "download_archive": "downloaded.txt",
-        "progress_hooks": [hook],
+        "progress_hooks": [hook, stage_timer.progress_hook],
+        "postprocessor_hooks": [stage_timer.postprocessor_hook],
         "postprocessors": [{
             "key": "FFmpegExtractAudio",
             "preferredcodec": filetype,
@@ -54,6 +60,7 @@ def download_playlist():
         }]
     }
 
+    stage_timer.reset()
     queue_download(link, ydl_opts)
 
 def queue_download(link: str, ydl_opts: dict, sleep_for: int = 1):
@@ -62,6 +69,7 @@ def queue_download(link: str, ydl_opts: dict, sleep_for: int = 1):
             try:
                 ydl.download([link])
             except:
+                metrics.increment("download_retries")
                 print(f"Process most likely rate limited, trying again in {int(sleep_for)} second(s).")
 
                 time.sleep(sleep_for)
@@ -72,6 +80,43 @@ def queue_download(link: str, ydl_opts: dict, sleep_for: int = 1):
     except Exception as e:
         print(f"An error occurred while trying to download the playlist: {e}")
 
+class StageTimer:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.last_finished = time.perf_counter()
+        self.download_started = {}
+        self.postprocess_started = {}
+
+    def progress_hook(self, d):
+        now = time.perf_counter()
+        filename = d.get("filename")
+
+        if d["status"] == "downloading" and filename not in self.download_started:
+            self.download_started[filename] = now
+            metrics.observe("download_extract", now - self.last_finished)
+        elif d["status"] == "finished":
+            metrics.observe("download_file", now - self.download_started.pop(filename, now))
+            metrics.increment("download_bytes", d.get("total_bytes") or d.get("downloaded_bytes") or 0)
+            metrics.increment("download_files")
+            self.last_finished = now
+        elif d["status"] == "error":
+            metrics.increment("download_errors")
+            self.last_finished = now
+
+    def postprocessor_hook(self, d):
+        now = time.perf_counter()
+        key = (d.get("postprocessor"), d.get("info_dict", {}).get("id"))
+
+        if d["status"] == "started":
+            self.postprocess_started[key] = now
+        elif d["status"] == "finished":
+            metrics.observe("download_postprocess", now - self.postprocess_started.pop(key, now))
+            self.last_finished = now
+
+stage_timer = StageTimer()
+
 def hook(d):
     if d["status"] == "finished":
         filename = Path(d["filename"]).stem
@@ -1,3 +1,4 @@
+import time
 import shutil
 import argparse
 import itertools
@@ -8,25 +9,41 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
 from jobdata import JobData
-from sconfig import parse_config_with_defaults
-from ffmparakeet import run_ffmpeg, ffmpeg_encoders
+from metrics import metrics
+from probe import probe_files
+from loudness import analyse_files, normalization_gain, TARGET_LOUDNESS
+from retag import copy_with_tags
+from filecache import default_cache_path, LEGACY_CACHE_FILENAME
+from encodemanifest import ConversionManifest
+from concurrency import AUTO, LoadThrottle, resolve_workers, ffmpeg_threads
+from scheduler import JobTiming, estimate_cost, longest_first, batch_jobs, run_timed, report_timings
+from sconfig import parse_config_with_defaults, to_bool
+from ffmparakeet import run_ffmpeg, run_ffmpeg_batch, ffmpeg_encoders, ffmpeg_destination, encoder_codec, clean_title, describe_error
+
+MANIFEST_SAVE_INTERVAL = 25
 
 def convert_and_partition():
     parser = argparse.ArgumentParser()
     parser.add_argument("-s", "--source", type=str, help="Music directory")
     parser.add_argument("-o", "--output", type=str, help="Output directory")
-    parser.add_argument("-t", "--max-threads", type=str, help="The number of CPUs to use")
+    parser.add_argument("-t", "--max-threads", type=str, help="The number of CPUs to use, or 'auto' to use every available CPU")
     parser.add_argument("-l", "--folder-track-limit", type=str, help="The maximum number of tracks per folder")
     parser.add_argument("-f", "--filetype", type=str, help="Output file type: i.e. mp3, aac, m4a, flac, wav, ogg")
+    parser.add_argument("-i", "--incremental", action="store_true", default=None, help="Only convert new or changed files and remove outputs whose sources are gone")
+    parser.add_argument("-p", "--passthrough", action=argparse.BooleanOptionalAction, default=None, help="Copy files already in the output codec instead of re-encoding them")
+    parser.add_argument("-r", "--timing-report", type=str, help="Write per-job timings to a JSON file")
+    parser.add_argument("-b", "--batch-size", type=int, help="Convert up to this many small files per ffmpeg process")
+    parser.add_argument("--metrics", type=str, help="Write timings and counters to this file at exit, as Prometheus text if it ends in .prom and JSON otherwise")
+    parser.add_argument("-n", "--normalize", action="store_true", default=None, help="Re-encode every file with the gain that brings it to the target loudness")
+    parser.add_argument("--target-loudness", type=float, help="Integrated loudness in LUFS that normalized files are brought to")
+    parser.add_argument("--max-load", type=float, help="Hold back new jobs while the load average per CPU is above this")
+    parser.add_argument("--max-iowait", type=float, help="Hold back new jobs while the share of CPU time spent waiting on I/O is above this percentage")
 
     args = parser.parse_args()
 
     source = args.source
     output = args.output
 
-    default_max_threads = 1
-    max_threads = default_max_threads if args.max_threads is None else args.max_threads
-
     def_folder_track_limit = 100_000
     folder_track_limit = def_folder_track_limit if args.folder_track_limit is None else args.folder_track_limit
 
@@ -39,16 +56,35 @@ def convert_and_partition():
             params=[
                 ("source", str, source),
                 ("output", str, output),
-                ("maxthreads", int, max_threads),
+                ("maxthreads", str, args.max_threads),
                 ("foldertracklimit", int, folder_track_limit),
-                ("filetype", str, filetype)]))
-
-    source, destination, max_threads, folder_track_limit, filetype = (
+                ("filetype", str, filetype),
+                ("incremental", to_bool, args.incremental),
+                ("passthrough", to_bool, args.passthrough),
+                ("timingreport", str, args.timing_report),
+                ("batchsize", int, args.batch_size),
+                ("maxload", float, args.max_load),
+                ("maxiowait", float, args.max_iowait),
+                ("metrics", str, args.metrics),
+                ("normalize", to_bool, args.normalize),
+                ("targetloudness", float, args.target_loudness)]))
+
+    metrics.export_at_exit(config_variables["metrics"], "encode")
+
+    source, destination, max_threads, folder_track_limit, filetype, incremental, passthrough, timing_report, batch_size, max_load, max_iowait, normalize, target_loudness = (
         config_variables["source"],
         config_variables["output"],
         config_variables["maxthreads"],
         config_variables["foldertracklimit"],
-        config_variables["filetype"])
+        config_variables["filetype"],
+        config_variables["incremental"] is True,
+        config_variables["passthrough"] is not False,
+        config_variables["timingreport"],
+        1 if config_variables["batchsize"] is None else max(1, config_variables["batchsize"]),
+        config_variables["maxload"],
+        config_variables["maxiowait"],
+        config_variables["normalize"] is True,
+        TARGET_LOUDNESS if config_variables["targetloudness"] is None else config_variables["targetloudness"])
 
     while source is None or not Path(source).is_dir():
         source = input("Source directory: ").strip('"')
@@ -56,20 +92,23 @@ def convert_and_partition():
     while destination is None:
         destination = input("Output directory: ").strip('"')
 
-    max_threads = int(max_threads)
-
-    encoder = ffmpeg_encoders[filetype.strip().lower()]
+    auto_threads = str(max_threads).strip().lower() == AUTO
+    max_threads = resolve_workers(max_threads)
+    folder_track_limit = int(folder_track_limit)
 
     folder_track_limit_info = f"a {folder_track_limit}" if folder_track_limit < def_folder_track_limit else "an unlimited"
+    incremental_info = " incrementally" if incremental else ""
+    auto_threads_info = " (auto)" if auto_threads else ""
+    normalize_info = f", normalized to {target_loudness} LUFS," if normalize else ""
 
-    ok = input(f"Copying and converting music from {source} to {destination} using {max_threads} thread(s) with a {folder_track_limit_info} track limit per folder. OK? (y/n): ")
+    ok = input(f"Copying and converting music{incremental_info} from {source} to {destination}{normalize_info} using {max_threads} thread(s){auto_threads_info} with a {folder_track_limit_info} track limit per folder. OK? (y/n): ")
 
     if ok.lower() != "y":
         return
 
     destination = Path(destination)
 
-    if destination.exists() and destination.is_dir():
+    if not incremental and destination.exists() and destination.is_dir():
         delete_directory = input(f"A folder already exists at {destination}.\n"
                                  f"Type 'yes' to delete the directory and continue: ")
 
@@ -78,12 +117,15 @@ def convert_and_partition():
 
         shutil.rmtree(destination)
 
-    destination.mkdir(parents=True, exist_ok=True)
+    timing_report = Path(timing_report) if timing_report else None
+    throttle = LoadThrottle(max_load=max_load, max_iowait=max_iowait / 100 if max_iowait is not None else None)
 
-    source_folder = Path(source)
+    convert_library(Path(source), destination, max_threads, folder_track_limit, filetype, incremental, passthrough, timing_report, throttle, batch_size, target_loudness if normalize else None)
 
-    audio_files = [ f for f in source_folder.rglob("*") if f.suffix.lower()[1:] in ffmpeg_encoders.keys() ]
+def discover_audio_files(source_folder: Path):
+    return [ f for f in source_folder.rglob("*") if f.suffix.lower()[1:] in ffmpeg_encoders.keys() ]
 
+def partition_jobs(audio_files: list[Path], destination: Path, folder_track_limit: int, filetype: str):
     folder_track_map = defaultdict(list)
 
     for file in audio_files:
@@ -111,14 +153,174 @@ def convert_and_partition():
                                           destination_path=(destination / f"{source_folder.name} ({first_track+1}-{last_track})" / track).with_suffix(f".{filetype}")) for track in
                                   batch])
 
-    with ThreadPoolExecutor(max_workers=max_threads) as executor:
-        futures = [executor.submit(run_ffmpeg, job_data.source_path, job_data.destination_path, encoder, True) for job_data in job_datas]
-        for f in tqdm(as_completed(futures), total=len(futures), desc="Processing files", unit="file", ncols=100):
-            result = f.result()
+    return job_datas
+
+def can_pass_through(job_data: JobData, probe, codec: str):
+    return (probe is not None
+            and probe["codec"] == codec
+            and job_data.source_path.suffix.lower() == job_data.destination_path.suffix.lower())
+
+def convert_job(job_data: JobData, encoder: str, stream_copy: bool, atomic: bool, threads: int | None = None, gain_db: float | None = None):
+    if stream_copy and job_data.source_path.suffix.lower() == ".mp3":
+        destination = ffmpeg_destination(job_data.source_path, job_data.destination_path, replace_title=True)
+        return copy_with_tags(job_data.source_path, destination, clean_title(job_data.source_path.stem))
+
+    return run_ffmpeg(job_data.source_path, job_data.destination_path, encoder, True, copy=stream_copy, atomic=atomic, threads=threads, gain_db=gain_db)
+
+def convert_batch(batch: tuple[JobData, ...], encoder: str, stream_copies: set, atomic: bool, threads: int | None = None, gains: dict | None = None):
+    gains = gains if gains is not None else {}
+
+    if len(batch) == 1:
+        job_data = batch[0]
+
+        try:
+            return [(job_data, convert_job(job_data, encoder, job_data in stream_copies, atomic, threads, gains.get(job_data)), None)]
+        except Exception as e:
+            return [(job_data, None, e)]
+
+    results = run_ffmpeg_batch([(job_data.source_path, job_data.destination_path) for job_data in batch], encoder, True, atomic=atomic, threads=threads, gains=[gains.get(job_data) for job_data in batch])
+
+    return [(job_data, output, error) for job_data, (output, error) in zip(batch, results)]
+
+def convert_library(source: Path, destination: Path, max_threads: int, folder_track_limit: int, filetype: str, incremental: bool = False, passthrough: bool = True, timing_report: Path | None = None, throttle: LoadThrottle | None = None, batch_size: int = 1, target_loudness: float | None = None):
+    encoder = ffmpeg_encoders[filetype.strip().lower()]
+    passthrough = passthrough and target_loudness is None
+    settings = f"codec={encoder};q=0;passthrough={int(passthrough)}"
+
+    if target_loudness is not None:
+        settings += f";loudness={target_loudness}"
+
+    destination.mkdir(parents=True, exist_ok=True)
+    (destination / LEGACY_CACHE_FILENAME).unlink(missing_ok=True)
+
+    cache_path = default_cache_path()
+
+    with metrics.timer("encode_discover"):
+        audio_files = discover_audio_files(source)
+        job_datas = partition_jobs(audio_files, destination, folder_track_limit, filetype)
+
+    manifest = ConversionManifest(destination) if incremental else None
+    source_stats = {}
+    skipped = 0
+    removed = 0
+
+    if manifest is not None:
+        for partial_file in destination.rglob(".*.part.*"):
+            partial_file.unlink()
+
+        pending_jobs = []
+        current_outputs = set()
+
+        for job_data in job_datas:
+            output = ffmpeg_destination(job_data.source_path, job_data.destination_path, replace_title=True)
+            stat = job_data.source_path.stat()
+
+            current_outputs.add(manifest.key(output))
+            source_stats[job_data] = stat
+
+            if manifest.is_current(output, job_data.source_path, stat, settings):
+                skipped += 1
+            else:
+                pending_jobs.append(job_data)
+
+        removed = manifest.prune(current_outputs)
+        manifest.save()
+
+        job_datas = pending_jobs
+
+        metrics.increment("encode_files_skipped", skipped)
+        metrics.increment("encode_outputs_removed", removed)
+
+    stream_copies = set()
+    with metrics.timer("encode_probe"):
+        probes = probe_files([job_data.source_path for job_data in job_datas], cache_path, workers=max_threads)
+
+    if probes is None:
+        probes = {}
+
+        if passthrough:
+            print("ffprobe was not found, so every file will be re-encoded.")
+    elif passthrough:
+        codec = encoder_codec(encoder)
+        stream_copies = {job_data for job_data in job_datas if can_pass_through(job_data, probes.get(job_data.source_path), codec)}
+
+    gains = {}
+
+    if target_loudness is not None:
+        with metrics.timer("encode_loudness"):
+            loudness = analyse_files([job_data.source_path for job_data in job_datas], cache_path, workers=max_threads)
+
+        gains = {job_data: normalization_gain(loudness.get(job_data.source_path), target_loudness) for job_data in job_datas}
+
+    costs = {job_data: estimate_cost(job_data.source_path, probes.get(job_data.source_path), job_data in stream_copies) for job_data in job_datas}
+    sizes = {job_data: job_data.source_path.stat().st_size for job_data in job_datas}
+
+    batches = batch_jobs(job_datas, sizes, batch_size, batchable=lambda job_data: job_data not in stream_copies)
+    batch_costs = {batch: sum(costs[job_data] for job_data in batch) for batch in batches}
+    batches = longest_first(batches, batch_costs)
+
+    throttle = throttle if throttle is not None else LoadThrottle()
+    threads = ffmpeg_threads(max_threads)
+
+    timings = []
+    failures = []
+    completed = 0
+    start_time = time.perf_counter()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_threads) as executor:
+            futures = {executor.submit(throttle.run, run_timed, convert_batch, batch, encoder, stream_copies, incremental, threads, gains): batch for batch in batches}
+
+            with tqdm(total=len(job_datas), desc="Processing files", unit="file", ncols=100) as progress:
+                for f in as_completed(futures):
+                    results, started, finished = f.result()
+                    batch = futures[f]
+
+                    batch_name = str(batch[0].source_path) if len(batch) == 1 else f"{batch[0].source_path} (+{len(batch) - 1} more)"
+                    timings.append(JobTiming(batch_name, batch_costs[batch], started - start_time, finished - started))
+
+                    metrics.observe("encode_queue_wait", started - start_time)
+                    metrics.observe("encode_job" if len(batch) == 1 else "encode_batch", finished - started)
+
+                    for job_data, output, error in results:
+                        completed += 1
+                        progress.update(1)
+
+                        if error is not None:
+                            failures.append((job_data, error))
+                            metrics.increment("encode_files_failed")
+                            continue
+
+                        metrics.increment("encode_files_converted")
+
+                        if manifest is not None:
+                            manifest.record(output, job_data.source_path, source_stats[job_data], settings)
+
+                            if completed % MANIFEST_SAVE_INTERVAL == 0:
+                                manifest.save()
+    finally:
+        if manifest is not None:
+            manifest.save()
+
+    report_timings(timings, time.perf_counter() - start_time, max_threads, timing_report)
+
+    metrics.increment("encode_stream_copies", len(stream_copies))
+    metrics.increment("encode_throttle_wait_seconds", throttle.waited)
+
+    if round(throttle.waited, 1) > 0:
+        print(f"Held back new jobs for {throttle.waited:.1f}s while the system was busy")
+
+    copy_info = f" ({len(stream_copies)} copied without re-encoding)" if len(stream_copies) > 0 else ""
+
+    for job_data, error in failures:
+        print(f"Failed to convert {job_data.source_path}: {describe_error(error)}")
 
-    print(f"Converted {len(audio_files)} audio files!")
+    if incremental:
+        print(f"Converted {len(job_datas) - len(failures)} audio files{copy_info}, {skipped} already up to date, removed {removed} stale outputs!")
+    else:
+        print(f"Converted {len(audio_files) - len(failures)} audio files{copy_info}!")
 
     # logger.info(f"Found {len(audio_files)} files")
 
 if __name__ == "__main__":
-    convert_and_partition()
\ No newline at end of file
+    convert_and_partition()
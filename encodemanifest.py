@@ -0,0 +1,73 @@
+import os
+import json
+from pathlib import Path
+
+MANIFEST_FILENAME = ".encode_manifest.json"
+MANIFEST_VERSION = 1
+
+class ConversionManifest:
+    def __init__(self, destination: Path):
+        self.destination = destination
+        self.manifest_path = destination / MANIFEST_FILENAME
+        self.entries: dict[str, dict] = {}
+
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+
+            if manifest.get("version") == MANIFEST_VERSION:
+                self.entries = manifest.get("entries", {})
+        except (OSError, ValueError):
+            pass
+
+    def key(self, output: Path):
+        return output.relative_to(self.destination).as_posix()
+
+    def is_current(self, output: Path, source: Path, stat: os.stat_result, settings: str):
+        entry = self.entries.get(self.key(output))
+
+        return (entry is not None
+                and entry["source"] == str(source)
+                and entry["size"] == stat.st_size
+                and entry["mtime_ns"] == stat.st_mtime_ns
+                and entry["settings"] == settings
+                and output.is_file())
+
+    def record(self, output: Path, source: Path, stat: os.stat_result, settings: str):
+        self.entries[self.key(output)] = {
+            "source": str(source),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "settings": settings
+        }
+
+    def prune(self, current_outputs: set[str]):
+        removed = 0
+
+        for key in [key for key in self.entries if key not in current_outputs]:
+            output = self.destination / key
+
+            if output.is_file():
+                output.unlink()
+                removed += 1
+
+            del self.entries[key]
+
+            for parent in output.parents:
+                if parent == self.destination or not parent.is_relative_to(self.destination):
+                    break
+
+                try:
+                    parent.rmdir()
+                except OSError:
+                    break
+
+        return removed
+
+    def save(self):
+        temp_path = self.manifest_path.with_suffix(".tmp")
+
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"version": MANIFEST_VERSION, "entries": self.entries}, file, ensure_ascii=False)
+
+        os.replace(temp_path, self.manifest_path)
@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+from jobdata import ExportJob
+from retag import copy_with_tags
+from metrics import metrics
+from scheduler import batch_jobs
+from ffmparakeet import run_ffmpeg, run_ffmpeg_batch, clean_title, describe_error
+
+EXPORT_RETRIES = 1
+EXPORT_MODES = ["encode", "copy"]
+
+def encode_track(job: ExportJob):
+    run_ffmpeg(source=job.source_path, destination=job.destination_path, album=job.album, track_num=job.track_num, gain_db=job.gain_db)
+
+def copy_track(job: ExportJob):
+    copy_with_tags(job.source_path, job.destination_path, clean_title(job.source_path.stem), album=job.album, track_num=job.track_num, gain_db=job.gain_db)
+
+export_functions = {
+    "encode": encode_track,
+    "copy": copy_track
+}
+
+def run_export_job(job: ExportJob, export, retries: int):
+    for attempt in range(retries + 1):
+        try:
+            export(job)
+            return None
+        except Exception as e:
+            error = describe_error(e)
+
+    return error
+
+def source_size(job: ExportJob):
+    try:
+        return job.source_path.stat().st_size
+    except OSError:
+        return float("inf")
+
+def run_export_batch(batch: tuple[ExportJob, ...], export, retries: int):
+    if len(batch) == 1:
+        return [(batch[0], run_export_job(batch[0], export, retries))]
+
+    try:
+        run_ffmpeg_batch([(job.source_path, job.destination_path) for job in batch], album=batch[0].album, track_nums=[job.track_num for job in batch], gains=[job.gain_db for job in batch], fallback=False)
+    except Exception:
+        return [(job, run_export_job(job, export, retries)) for job in batch]
+
+    return [(job, None) for job in batch]
+
+def export_tracks(jobs: list[ExportJob], workers: int = 1, retries: int = EXPORT_RETRIES, export=encode_track, batch_size: int = 1):
+    failures = []
+    exported_bytes = 0
+
+    start_time = time.perf_counter()
+
+    sizes = {job: source_size(job) for job in jobs} if batch_size > 1 and export is encode_track else {}
+    batches = batch_jobs(jobs, sizes, batch_size if export is encode_track else 1)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(run_export_batch, batch, export, retries) for batch in batches]
+
+        with tqdm(total=len(jobs), desc="Exporting tracks", unit="track", ncols=100) as progress:
+            for future in as_completed(futures):
+                for job, error in future.result():
+                    progress.update(1)
+
+                    if error is None:
+                        exported_bytes += job.destination_path.stat().st_size
+                    else:
+                        failures.append((job, error))
+
+    wall_time = time.perf_counter() - start_time
+
+    metrics.observe("export_mix", wall_time)
+    metrics.increment("export_tracks_exported", len(jobs) - len(failures))
+    metrics.increment("export_tracks_failed", len(failures))
+
+    return failures, exported_bytes, wall_time
@@ -0,0 +1,42 @@
+import os
+import sys
+import shutil
+from pathlib import Path
+
+FICLONE = 0x40049409
+
+def reflink(source_file, destination_file):
+    import fcntl
+
+    fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+
+def copy_range(source_file, destination_file):
+    remaining = os.fstat(source_file.fileno()).st_size
+
+    while remaining > 0:
+        copied = os.copy_file_range(source_file.fileno(), destination_file.fileno(), remaining)
+
+        if copied <= 0:
+            raise OSError("copy_file_range made no progress")
+
+        remaining -= copied
+
+def copy_file(source: Path, destination: Path):
+    if sys.platform == "linux":
+        with open(source, "rb") as source_file, open(destination, "wb") as destination_file:
+            try:
+                reflink(source_file, destination_file)
+                return "reflink"
+            except OSError:
+                pass
+
+            if hasattr(os, "copy_file_range"):
+                try:
+                    copy_range(source_file, destination_file)
+                    return "copy_file_range"
+                except OSError:
+                    pass
+
+    shutil.copyfile(source, destination)
+
+    return "copyfile"
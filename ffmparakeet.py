@@ -1,7 +1,56 @@
+import os
 import re
 import subprocess
 from pathlib import Path
 
+def clean_title(stem: str):
+    return re.sub(r"\s\([a-z0-9]+_(?:Opus|AAC)\)$", '', stem)
+
+def ffmpeg_destination(source: Path, destination: Path, replace_title: bool = False):
+    if replace_title:
+        return destination.parent / f"{clean_title(source.stem)}{destination.suffix}"
+
+    return destination
+
+def describe_error(e: Exception):
+    if isinstance(e, subprocess.CalledProcessError):
+        return f"ffmpeg exited with status {e.returncode}"
+
+    return f"{type(e).__name__}: {e}"
+
+def partial_destination(destination: Path):
+    return destination.with_name(f".{destination.stem}.part{destination.suffix}")
+
+ATTACHED_PICTURE_SUFFIXES = (".mp3", ".flac")
+
+def output_options(title: str, codec: str, copy: bool, album: str, track_num: int, threads: int | None, gain_db: float | None = None):
+    options = []
+
+    if not copy:
+        options.extend(["-codec:a", codec])
+
+        if gain_db is not None:
+            options.extend(["-af", f"volume={gain_db}dB"])
+    else:
+        options.extend(["-c", "copy"])
+
+    if threads is not None:
+        options.extend(["-threads", str(threads)])
+
+    options.extend(["-q:a", "0"])
+    options.extend(["-metadata", f"title={title}"])
+
+    if track_num >= 0:
+        options.extend(["-metadata", f"track={track_num}"])
+
+    if album.strip() != "":
+        options.extend(["-metadata", f"album={album}"])
+
+    options.extend(["-id3v2_version", "3"])
+    options.append("-y")
+
+    return options
+
 def run_ffmpeg(
         source: Path,
         destination: Path,
@@ -10,43 +59,114 @@ def run_ffmpeg(
         quiet: bool = True,
         copy: bool = False,
         album: str = "",
-        track_num: int = -1):
+        track_num: int = -1,
+        atomic: bool = False,
+        threads: int | None = None,
+        gain_db: float | None = None):
     destination.parent.mkdir(parents=True, exist_ok=True)
 
-    clean_title = re.sub(r"\s\([a-z0-9]+_(?:Opus|AAC)\)$", '', source.stem)
+    title = clean_title(source.stem)
 
     command = [ "ffmpeg" ]
 
-    if replace_title:
-        destination = str(destination.parent / f"{clean_title}{destination.suffix}")
-    else:
-        destination = str(destination)
+    destination = ffmpeg_destination(source, destination, replace_title)
+    output = partial_destination(destination) if atomic else destination
 
     if quiet:
         command.extend(["-loglevel", "error"])
 
     command.extend(["-i", source])
+    command.extend(["-map_metadata", "0"])
+    command.extend(output_options(title, codec, copy, album, track_num, threads, gain_db))
+    command.append(str(output))
 
-    if not copy:
-        command.extend(["-codec:a", codec])
-    else:
-        command.extend(["-c", "copy"])
+    try:
+        subprocess.run(command, check=True) # shell=True works on Windows
+    except BaseException:
+        if atomic:
+            output.unlink(missing_ok=True)
 
-    command.extend(["-q:a", "0"])
-    command.extend(["-map_metadata", "0"])
-    command.extend(["-metadata", f"title={clean_title}"])
+        raise
 
-    if track_num >= 0:
-        command.extend(["-metadata", f"track={track_num}"])
+    if atomic:
+        os.replace(output, destination)
 
-    if album.strip() != "":
-        command.extend(["-metadata", f"album={album}"])
+    return destination
+
+def run_ffmpeg_batch(
+        files: list[tuple[Path, Path]],
+        codec: str = "libmp3lame",
+        replace_title: bool = False,
+        quiet: bool = True,
+        copy: bool = False,
+        album: str = "",
+        track_nums: list[int] | None = None,
+        atomic: bool = False,
+        threads: int | None = None,
+        gains: list[float | None] | None = None,
+        fallback: bool = True):
+    track_nums = track_nums if track_nums is not None else [-1] * len(files)
+    gains = gains if gains is not None else [None] * len(files)
+
+    command = [ "ffmpeg" ]
+    destinations = []
+    outputs = []
+
+    if quiet:
+        command.extend(["-loglevel", "error"])
+
+    for source, _ in files:
+        command.extend(["-i", source])
+
+    try:
+        for input_index, ((source, destination), track_num, gain_db) in enumerate(zip(files, track_nums, gains)):
+            destination.parent.mkdir(parents=True, exist_ok=True)
 
-    command.extend(["-id3v2_version", "3"])
-    command.append("-y")
-    command.append(str(destination))
+            destination = ffmpeg_destination(source, destination, replace_title)
+            output = partial_destination(destination) if atomic else destination
 
-    subprocess.run(command, check=True) # shell=True works on Windows
+            command.extend(["-map", f"{input_index}:a:0"])
+
+            if destination.suffix.lower() in ATTACHED_PICTURE_SUFFIXES:
+                command.extend(["-map", f"{input_index}:v:0?"])
+
+            command.extend(["-map_metadata", str(input_index)])
+            command.extend(output_options(clean_title(source.stem), codec, copy, album, track_num, threads, gain_db))
+            command.append(str(output))
+
+            destinations.append(destination)
+            outputs.append(output)
+
+        subprocess.run(command, check=True)
+    except Exception:
+        if atomic:
+            for output in outputs:
+                output.unlink(missing_ok=True)
+
+        if not fallback:
+            raise
+
+        results = []
+
+        for (source, destination), track_num, gain_db in zip(files, track_nums, gains):
+            try:
+                results.append((run_ffmpeg(source, destination, codec, replace_title, quiet, copy, album, track_num, atomic, threads, gain_db), None))
+            except Exception as e:
+                results.append((None, e))
+
+        return results
+    except BaseException:
+        if atomic:
+            for output in outputs:
+                output.unlink(missing_ok=True)
+
+        raise
+
+    if atomic:
+        for output, destination in zip(outputs, destinations):
+            os.replace(output, destination)
+
+    return [(destination, None) for destination in destinations]
 
 ffmpeg_encoders = {
     "mp3": "libmp3lame",
@@ -74,6 +194,15 @@ ffmpeg_encoders = {
     "raw": "pcm_s16le"
 }
 
+encoder_codecs = {
+    "libmp3lame": "mp3",
+    "libvorbis": "vorbis",
+    "libopus": "opus"
+}
+
+def encoder_codec(encoder: str):
+    return encoder_codecs.get(encoder, encoder)
+
 import sys
 
 def get_os():
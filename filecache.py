@@ -0,0 +1,86 @@
+import os
+import sys
+import json
+import sqlite3
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from tqdm import tqdm
+
+CACHE_FILENAME = "file_cache.sqlite3"
+LEGACY_CACHE_FILENAME = ".file_cache.sqlite3"
+CACHE_DIRNAME = "MParakeet"
+
+def user_cache_directory():
+    if sys.platform == "win32":
+        base = Path(os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local")
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+
+    return base / CACHE_DIRNAME
+
+def default_cache_path():
+    directory = user_cache_directory()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    return directory / CACHE_FILENAME
+
+class FileCache:
+    def __init__(self, cache_path: Path, namespace: str):
+        self.namespace = namespace
+        self.connection = sqlite3.connect(cache_path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "namespace TEXT NOT NULL, "
+            "path TEXT NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, "
+            "value TEXT NOT NULL, "
+            "PRIMARY KEY (namespace, path))")
+
+    def close(self):
+        self.connection.close()
+
+    def get(self, path: Path):
+        stat = path.stat()
+
+        row = self.connection.execute(
+            "SELECT value FROM entries WHERE namespace = ? AND path = ? AND size = ? AND mtime_ns = ?",
+            (self.namespace, str(path.absolute()), stat.st_size, stat.st_mtime_ns)).fetchone()
+
+        return json.loads(row[0]) if row is not None else None
+
+    def put_many(self, items):
+        rows = []
+
+        for path, value in items:
+            stat = path.stat()
+            rows.append((self.namespace, str(path.absolute()), stat.st_size, stat.st_mtime_ns, json.dumps(value)))
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO entries (namespace, path, size, mtime_ns, value) VALUES (?, ?, ?, ?, ?)", rows)
+
+def map_cached(paths: list[Path], cache_path: Path, namespace: str, function, workers: int = 1, desc: str = "Analysing files"):
+    cache = FileCache(cache_path, namespace)
+
+    try:
+        results = {path: cache.get(path) for path in paths}
+        missing = [path for path, result in results.items() if result is None]
+        progress = dict(total=len(missing), desc=desc, unit="file", ncols=100, disable=len(missing) <= 0)
+
+        if workers > 1 and len(missing) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                computed = list(tqdm(executor.map(function, missing), **progress))
+        else:
+            computed = [function(path) for path in tqdm(missing, **progress)]
+
+        computed = [(path, result) for path, result in zip(missing, computed) if result is not None]
+        results.update(computed)
+        cache.put_many(computed)
+    finally:
+        cache.close()
+
+    return results
@@ -0,0 +1,284 @@
+import random
+
+class GroupNode:
+    __slots__ = ("group", "priority", "left", "right", "size", "count", "own", "summary")
+
+    def __init__(self, group: list, own: tuple):
+        self.group = group
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.size = 1
+        self.count = len(group)
+        self.own = own
+        self.summary = own
+
+def size(node):
+    return node.size if node is not None else 0
+
+def count(node):
+    return node.count if node is not None else 0
+
+def combine(*summaries):
+    return tuple(map(sum, zip(*summaries)))
+
+def update(node):
+    node.size = 1 + size(node.left) + size(node.right)
+    node.count = len(node.group) + count(node.left) + count(node.right)
+
+    if node.left is None and node.right is None:
+        node.summary = node.own
+    else:
+        node.summary = combine(*(child.summary for child in (node.left, node.right) if child is not None), node.own)
+
+def split(node, group_index):
+    if node is None:
+        return None, None
+
+    if size(node.left) < group_index:
+        node.right, right = split(node.right, group_index - size(node.left) - 1)
+        update(node)
+
+        return node, right
+
+    left, node.left = split(node.left, group_index)
+    update(node)
+
+    return left, node
+
+def merge(left, right):
+    if left is None:
+        return right
+
+    if right is None:
+        return left
+
+    if left.priority > right.priority:
+        left.right = merge(left.right, right)
+        update(left)
+
+        return left
+
+    right.left = merge(left, right.left)
+    update(right)
+
+    return right
+
+class GroupTree:
+    def __init__(self, measure=None):
+        self.root = None
+        self.measure = measure if measure is not None else lambda group: ()
+
+    def __len__(self):
+        return size(self.root)
+
+    def __iter__(self):
+        stack = []
+        node = self.root
+
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+
+            node = stack.pop()
+            yield node.group
+            node = node.right
+
+    def __getitem__(self, group_index):
+        return self.node_path(group_index)[-1].group
+
+    def iter_from(self, group_index):
+        stack = []
+        node = self.root
+
+        while node is not None:
+            left_size = size(node.left)
+
+            if group_index < left_size:
+                stack.append(node)
+                node = node.left
+            elif group_index == left_size:
+                stack.append(node)
+                break
+            else:
+                group_index -= left_size + 1
+                node = node.right
+
+        while stack:
+            node = stack.pop()
+            yield node.group
+            node = node.right
+
+            while node is not None:
+                stack.append(node)
+                node = node.left
+
+    def track_count(self):
+        return count(self.root)
+
+    def summary(self):
+        return self.root.summary if self.root is not None else self.measure([])
+
+    def prefix(self, group_index):
+        summaries = []
+        node = self.root
+
+        while node is not None:
+            left_size = size(node.left)
+
+            if group_index <= left_size:
+                node = node.left
+            else:
+                if node.left is not None:
+                    summaries.append(node.left.summary)
+
+                summaries.append(node.own)
+                group_index -= left_size + 1
+                node = node.right
+
+        return combine(*summaries) if summaries else self.measure([])
+
+    def select(self, field, rank):
+        group_index = 0
+        node = self.root
+
+        while node is not None:
+            left_value = node.left.summary[field] if node.left is not None else 0
+
+            if rank < left_value:
+                node = node.left
+                continue
+
+            group_index += size(node.left)
+            rank -= left_value
+
+            if rank < node.own[field]:
+                return group_index
+
+            group_index += 1
+            rank -= node.own[field]
+            node = node.right
+
+        return -1
+
+    def node_path(self, group_index):
+        if group_index < 0:
+            group_index += len(self)
+
+        if group_index < 0 or group_index >= len(self):
+            raise IndexError("group index out of range")
+
+        path = []
+        node = self.root
+
+        while True:
+            path.append(node)
+            left_size = size(node.left)
+
+            if group_index < left_size:
+                node = node.left
+            elif group_index == left_size:
+                return path
+            else:
+                group_index -= left_size + 1
+                node = node.right
+
+    def refresh(self, group_index):
+        path = self.node_path(group_index)
+        path[-1].own = self.measure(path[-1].group)
+
+        for node in reversed(path):
+            update(node)
+
+    def remeasure(self):
+        nodes = []
+        stack = [self.root] if self.root is not None else []
+
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            stack.extend(child for child in (node.left, node.right) if child is not None)
+
+        for node in reversed(nodes):
+            node.own = self.measure(node.group)
+            update(node)
+
+    def insert(self, group_index, group: list):
+        left, right = split(self.root, group_index)
+        self.root = merge(merge(left, GroupNode(group, self.measure(group))), right)
+
+    def pop(self, group_index):
+        left, right = split(self.root, group_index)
+        node, right = split(right, 1)
+        self.root = merge(left, right)
+
+        return node.group
+
+    def locate(self, track_index):
+        if track_index < 0 or track_index >= self.track_count():
+            return -1, -1
+
+        group_index = 0
+        node = self.root
+
+        while True:
+            left_count = count(node.left)
+
+            if track_index < left_count:
+                node = node.left
+                continue
+
+            group_index += size(node.left)
+            track_index -= left_count
+
+            if track_index < len(node.group):
+                return group_index, track_index
+
+            group_index += 1
+            track_index -= len(node.group)
+            node = node.right
+
+    def group_start(self, group_index):
+        track_index = 0
+        node = self.root
+
+        while node is not None:
+            left_size = size(node.left)
+
+            if group_index <= left_size:
+                if group_index == left_size:
+                    return track_index + count(node.left)
+
+                node = node.left
+            else:
+                track_index += count(node.left) + len(node.group)
+                group_index -= left_size + 1
+                node = node.right
+
+        return track_index
+
+    def track_at(self, track_index):
+        group_index, local_index = self.locate(track_index)
+
+        if group_index < 0:
+            raise IndexError("track index out of range")
+
+        return self[group_index][local_index]
+
+    def insert_track(self, group_index, local_index, track):
+        self[group_index].insert(local_index, track)
+        self.refresh(group_index)
+
+    def set_track(self, group_index, local_index, track):
+        self[group_index][local_index] = track
+        self.refresh(group_index)
+
+    def remove_track(self, group_index, local_index):
+        group = self[group_index]
+        del group[local_index]
+
+        if len(group) <= 0:
+            self.pop(group_index)
+        else:
+            self.refresh(group_index)
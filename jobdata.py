@@ -4,4 +4,12 @@ from dataclasses import dataclass
 @dataclass (frozen=True)
 class JobData:
     source_path: Path
-    destination_path: Path
\ No newline at end of file
+    destination_path: Path
+
+@dataclass (frozen=True)
+class ExportJob:
+    source_path: Path
+    destination_path: Path
+    track_num: int
+    album: str
+    gain_db: float | None = None
@@ -0,0 +1,136 @@
+import sqlite3
+from pathlib import Path
+
+from trackscan import scan_tracks
+from metrics import metrics
+
+INDEX_FILENAME = ".library_index.sqlite3"
+SCHEMA_VERSION = 1
+
+class LibraryIndex:
+    def __init__(self, index_path: Path, root: Path):
+        self.root = str(root.resolve())
+        self.connection = sqlite3.connect(index_path)
+
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS tracks")
+            self.connection.execute("DROP TABLE IF EXISTS failures")
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS tracks ("
+            "root TEXT NOT NULL, "
+            "path TEXT NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "title TEXT NOT NULL, "
+            "length REAL NOT NULL, "
+            "PRIMARY KEY (root, path))")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS failures ("
+            "root TEXT NOT NULL, "
+            "path TEXT NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "PRIMARY KEY (root, path))")
+
+    def close(self):
+        self.connection.close()
+
+    def entries(self):
+        rows = self.connection.execute(
+            "SELECT path, mtime_ns, size, title, length FROM tracks WHERE root = ?", (self.root,))
+
+        return {path: (mtime_ns, size, title, length) for path, mtime_ns, size, title, length in rows}
+
+    def failures(self):
+        rows = self.connection.execute(
+            "SELECT path, mtime_ns, size FROM failures WHERE root = ?", (self.root,))
+
+        return {path: (mtime_ns, size) for path, mtime_ns, size in rows}
+
+    def write(self, tracks, failed, removed):
+        with metrics.timer("index_write"), self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO tracks (root, path, mtime_ns, size, title, length) VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.root, *entry) for entry in tracks])
+            self.connection.executemany(
+                "DELETE FROM tracks WHERE root = ? AND path = ?",
+                [(self.root, path) for path in [*removed, *(path for path, _, _ in failed)]])
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO failures (root, path, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                [(self.root, *entry) for entry in failed])
+            self.connection.executemany(
+                "DELETE FROM failures WHERE root = ? AND path = ?",
+                [(self.root, path) for path in [*removed, *(entry[0] for entry in tracks)]])
+
+    def sync(self, files: list[Path], workers: int = 1):
+        with metrics.timer("index_stat"):
+            known = self.entries()
+            known_failures = self.failures()
+
+            seen = set()
+            changed = []
+
+            for file in files:
+                path = str(file)
+                stat = file.stat()
+
+                if known_failures.get(path) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+
+                seen.add(path)
+
+                entry = known.get(path)
+
+                if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+                    changed.append((path, stat))
+
+        with metrics.timer("index_parse"):
+            track_infos = scan_tracks([path for path, _ in changed], workers)
+
+        failed = []
+
+        for (path, stat), track_info in zip(changed, track_infos):
+            if track_info is None:
+                seen.discard(path)
+                failed.append((path, stat.st_mtime_ns, stat.st_size))
+            else:
+                known[path] = (stat.st_mtime_ns, stat.st_size, *track_info)
+
+        changed = [(path, stat) for path, stat in changed if path in seen]
+        removed = [path for path in known if path not in seen]
+        file_paths = set(map(str, files))
+
+        self.write([(path, *known[path]) for path, _ in changed], failed, [*removed, *(path for path in known_failures if path not in file_paths)])
+
+        for path in removed:
+            del known[path]
+
+        return [(path, known[path][2], known[path][3]) for path in map(str, files) if path in known], len(changed), len(removed)
+
+    def update(self, paths: list[str], workers: int = 1):
+        existing = []
+        removed = []
+
+        for path in paths:
+            try:
+                existing.append((path, Path(path).stat()))
+            except OSError:
+                removed.append(path)
+
+        with metrics.timer("index_parse"):
+            track_infos = scan_tracks([path for path, _ in existing], workers)
+
+        updated = []
+        failed = []
+
+        for (path, stat), track_info in zip(existing, track_infos):
+            if track_info is None:
+                failed.append((path, stat.st_mtime_ns, stat.st_size))
+            else:
+                updated.append((path, stat.st_mtime_ns, stat.st_size, *track_info))
+
+        self.write(updated, failed, removed)
+
+        return [(path, title, length) for path, _, _, title, length in updated], [*removed, *(path for path, _, _ in failed)]
@@ -1,31 +1,138 @@
-from collections import defaultdict
-from difflib import SequenceMatcher
+import os
 from pathlib import Path
+from collections import defaultdict
+
+from colorama import Fore, Style
 
-from mutagen.mp3 import MP3
-from mutagen.easyid3 import EasyID3
+from libraryindex import LibraryIndex, INDEX_FILENAME
+from trackscan import scan_tracks, read_mix_track_info, audio_fingerprint, find_audio_files
+from mixmanifest import read_mix_manifest
+from track import Track
+from titlematch import TitleIndex, LOW_CONFIDENCE
+from ottlog import logger
+from metrics import metrics
 
 class Loader:
-    audio_files: list[MP3] = []
-    file_name_to_audio_file: defaultdict[str, MP3] = defaultdict()
+    audio_files: list[Track] = []
+    file_name_to_audio_file: dict[str, Track] = {}
+    path_to_audio_file: dict[str, Track] = {}
+    title_to_audio_files: defaultdict[str, list[Track]] = defaultdict(list)
+    name_to_audio_files: defaultdict[str, list[Track]] = defaultdict(list)
     file_names: list[str] = []
+    title_index: TitleIndex | None = None
 
-    def __init__(self, search, output):
+    def __init__(self, search, output, scan_workers=1):
         output.mkdir(parents=True, exist_ok=True)
 
-        files = list(search.rglob("*.mp3"))
+        self.scan_workers = scan_workers
+        self.search = search.resolve()
+        self.output = output
+
+        with metrics.timer("loader_discover"):
+            files = find_audio_files(search.resolve())
+
+        index = LibraryIndex(output / INDEX_FILENAME, search)
+
+        try:
+            entries, changed, removed = index.sync(files, workers=scan_workers)
+        finally:
+            index.close()
+
+        logger.info(f"Indexed {len(entries)} tracks ({changed} parsed, {removed} removed)")
+
+        metrics.increment("library_tracks", len(entries))
+        metrics.increment("library_tracks_parsed", changed)
+        metrics.increment("library_tracks_removed", removed)
+
+        with metrics.timer("loader_maps"):
+            self.build_maps(entries)
+
+    def build_maps(self, entries):
+        self.audio_files = []
+        self.file_name_to_audio_file = {}
+        self.path_to_audio_file = {}
+        self.title_to_audio_files = defaultdict(list)
+        self.name_to_audio_files = defaultdict(list)
+        self.file_names = []
+
+        for path, title, length in entries:
+            self.add_audio_file(Track(title=title, path=path, length=length))
+
+    def add_audio_file(self, audio_file: Track):
+        self.audio_files.append(audio_file)
+        self.file_names.append(audio_file.title)
+        self.file_name_to_audio_file[audio_file.title] = audio_file
+        self.path_to_audio_file[audio_file.path] = audio_file
+        self.title_to_audio_files[audio_file.title].append(audio_file)
+        self.name_to_audio_files[Path(audio_file.path).name].append(audio_file)
+
+    def remove_audio_file(self, audio_file: Track):
+        self.audio_files.remove(audio_file)
+        self.file_names.remove(audio_file.title)
+        del self.path_to_audio_file[audio_file.path]
+
+        same_title = self.title_to_audio_files[audio_file.title]
+        same_title.remove(audio_file)
+
+        if len(same_title) <= 0:
+            del self.title_to_audio_files[audio_file.title]
+            del self.file_name_to_audio_file[audio_file.title]
+        elif self.file_name_to_audio_file[audio_file.title] == audio_file:
+            self.file_name_to_audio_file[audio_file.title] = same_title[-1]
+
+        same_name = self.name_to_audio_files[Path(audio_file.path).name]
+        same_name.remove(audio_file)
+
+        if len(same_name) <= 0:
+            del self.name_to_audio_files[Path(audio_file.path).name]
+
+    def expand_changes(self, paths):
+        files = {path for path in paths if not path.endswith(os.sep)}
+
+        for directory in (path for path in paths if path.endswith(os.sep)):
+            files.update(path for path in self.path_to_audio_file if path.startswith(directory))
+            files.update(str(file) for file in find_audio_files(Path(directory)))
+
+        return files
+
+    def apply_changes(self, paths):
+        paths = self.expand_changes(paths)
+        index = LibraryIndex(self.output / INDEX_FILENAME, self.search)
+
+        try:
+            updated, removed = index.update(sorted(paths), workers=self.scan_workers)
+        finally:
+            index.close()
+
+        for path in [*removed, *(path for path, _, _ in updated)]:
+            audio_file = self.path_to_audio_file.get(path)
 
-        self.audio_files = [MP3(file, ID3=EasyID3) for file in files]
+            if audio_file is not None:
+                self.remove_audio_file(audio_file)
 
-        for audio_file in self.audio_files:
-            track_name = audio_file.get('Title', Path(audio_file.filename).stem)[0]
+        for path, title, length in updated:
+            self.add_audio_file(Track(title=title, path=path, length=length))
 
-            self.file_names.append(track_name)
-            self.file_name_to_audio_file[track_name] = audio_file
+        self.title_index = None
+
+        metrics.increment("library_tracks_updated", len(updated))
+        metrics.increment("library_tracks_removed", len(removed))
+
+        return len(updated), len(removed)
+
+    def get_title_index(self):
+        if self.title_index is None:
+            with metrics.timer("title_index_build"):
+                self.title_index = TitleIndex(self.audio_files)
+
+        return self.title_index
+
+    def load_mix(self, loaded_mix_path, mix, confirm=True):
+        mix_title = loaded_mix_path.stem
 
-    def load_mix(self, loaded_mix_path, mix):
         if loaded_mix_path.is_file():
-            mix_title = loaded_mix_path.stem
+            title_index = self.get_title_index()
+            low_confidence_matches = []
 
             with open(loaded_mix_path, 'r') as file:
                 for line in file:
@@ -34,31 +141,81 @@ class Loader:
                     else:
                         processed_line = line.strip()
 
-                        track = None
-                        best_match = 0
+                        with metrics.timer("mix_match"):
+                            track, confidence = title_index.match(processed_line)
 
-                        for audio_track in self.audio_files:
-                            match_ratio = SequenceMatcher(None,
-                                                          audio_track.get('Title', Path(audio_track.filename).stem)[0],
-                                                          processed_line).ratio()
+                        if track is None:
+                            metrics.increment("mix_unmatched")
+                        else:
+                            mix.add_track_or_break(track)
+                            metrics.increment("mix_matched")
 
-                            if match_ratio > best_match:
-                                best_match = match_ratio
-                                track = audio_track
+                            if confidence < LOW_CONFIDENCE:
+                                low_confidence_matches.append((processed_line, track, confidence))
+                                metrics.increment("mix_low_confidence")
 
-                        if track is not None:
-                            mix.add_track_or_break(track)
+            for processed_line, track, confidence in low_confidence_matches:
+                print(f"{Fore.RED}{confidence:.0%}{Style.RESET_ALL} match for {Fore.YELLOW}{processed_line}{Style.RESET_ALL}: {track.title}")
 
         elif loaded_mix_path.is_dir():
-            mix_title = loaded_mix_path.stem
-
-            mix_tracks = list(loaded_mix_path.rglob("*.mp3"))
-            mix_audio_files = [MP3(file, ID3=EasyID3) for file in mix_tracks]
+            with metrics.timer("mix_directory_load"):
+                tracks_and_breaks = self.load_mix_directory(loaded_mix_path)
 
-            for audio_file in mix_audio_files:
-                audio_file_as_track = self.file_name_to_audio_file[audio_file.get('Title', Path(audio_file.filename).stem)[0]]
-                mix.add_track_or_break(audio_file_as_track)
+            for track_or_break in tracks_and_breaks:
+                mix.add_track_or_break(track_or_break)
         else:
             print(f"Didn't find a file or directory to load a mix from at {loaded_mix_path}.\nPress enter to continue")
 
-        input(f"Loaded {mix.track_count()} tracks from {mix_title}.\nPress enter to continue")
\ No newline at end of file
+        if confirm:
+            input(f"Loaded {mix.track_count()} tracks from {mix_title}.\nPress enter to continue")
+
+    def load_mix_directory(self, mix_path):
+        tracks_and_breaks = []
+        claimed_files = set()
+
+        for entry in read_mix_manifest(mix_path):
+            if "break" in entry:
+                tracks_and_breaks.append(entry["break"])
+                continue
+
+            track = self.path_to_audio_file.get(entry["source"])
+
+            if track is not None and (mix_path / entry["file"]).is_file():
+                tracks_and_breaks.append(track)
+                claimed_files.add(entry["file"])
+
+        unclaimed_files = [str(file) for file in find_audio_files(mix_path) if file.relative_to(mix_path).as_posix() not in claimed_files]
+
+        if len(unclaimed_files) <= 0:
+            return tracks_and_breaks
+
+        mix_track_infos = scan_tracks(unclaimed_files, workers=self.scan_workers, reader=read_mix_track_info, desc="Reading mix")
+        mix_tracks = [(Path(file), *track_info) for file, track_info in zip(unclaimed_files, mix_track_infos) if track_info is not None]
+        mix_tracks.sort(key=lambda mix_track: (mix_track[3] is None, mix_track[3] or 0, mix_track[0].name))
+
+        for file, title, length, _ in mix_tracks:
+            with metrics.timer("mix_identify"):
+                track = self.identify_track(file, title, length)
+
+            if track is None:
+                print(f"Couldn't find {Fore.YELLOW}{title}{Style.RESET_ALL} in the library")
+                metrics.increment("mix_unmatched")
+            else:
+                metrics.increment("mix_matched")
+                tracks_and_breaks.append(track)
+
+        return tracks_and_breaks
+
+    def identify_track(self, file, title, length):
+        candidates = self.title_to_audio_files.get(title) or self.name_to_audio_files.get(file.name, [])
+
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else None
+
+        fingerprint = audio_fingerprint(file)
+
+        for candidate in candidates:
+            if audio_fingerprint(Path(candidate.path)) == fingerprint:
+                return candidate
+
+        return min(candidates, key=lambda candidate: abs(candidate.length - length))
@@ -0,0 +1,106 @@
+import math
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+from pcm import stream_pcm, SAMPLE_RATE
+from filecache import map_cached
+
+TARGET_LOUDNESS = -14.0
+PEAK_CEILING = -1.0
+SEGMENT_SECONDS = 0.1
+BLOCK_SEGMENTS = 4
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+SEGMENTS_PER_CHUNK = 100
+
+SHELF = ([1.53512485958697, -2.69169618940638, 1.19839281085285], [1.0, -1.69065929318241, 0.73248077421585])
+HIGH_PASS = ([1.0, -2.0, 1.0], [1.0, -1.99004745483398, 0.99007225036621])
+
+def biquad_power_response(coefficients, frequencies: np.ndarray, sample_rate: int):
+    b, a = coefficients
+    z = np.exp(-2j * np.pi * frequencies / sample_rate)
+
+    numerator = b[0] + b[1] * z + b[2] * z * z
+    denominator = a[0] + a[1] * z + a[2] * z * z
+
+    return np.abs(numerator / denominator) ** 2
+
+def k_weighting(segment_length: int, sample_rate: int = SAMPLE_RATE):
+    frequencies = np.fft.rfftfreq(segment_length, d=1 / sample_rate)
+    return biquad_power_response(SHELF, frequencies, sample_rate) * biquad_power_response(HIGH_PASS, frequencies, sample_rate)
+
+def segment_energies(chunk: np.ndarray, weights: np.ndarray, segment_length: int):
+    segments = len(chunk) // segment_length
+    spectrum = np.fft.rfft(chunk[:segments * segment_length].reshape(segments, segment_length, -1), axis=1)
+
+    return np.einsum("f,sfc->sc", weights, np.abs(spectrum) ** 2) / segment_length ** 2
+
+def block_loudness(mean_square: np.ndarray):
+    with np.errstate(divide="ignore"):
+        return -0.691 + 10 * np.log10(mean_square)
+
+def gated_loudness(energies: np.ndarray):
+    if len(energies) < BLOCK_SEGMENTS:
+        return None
+
+    windows = np.lib.stride_tricks.sliding_window_view(energies, BLOCK_SEGMENTS, axis=0)
+    blocks = windows.mean(axis=-1).sum(axis=1)
+
+    gated = blocks[block_loudness(blocks) > ABSOLUTE_GATE]
+
+    if len(gated) <= 0:
+        return None
+
+    relative_gate = block_loudness(gated.mean()) + RELATIVE_GATE
+    gated = gated[block_loudness(gated) > relative_gate]
+
+    return float(block_loudness(gated.mean()))
+
+def measure_loudness(chunks, sample_rate: int = SAMPLE_RATE):
+    segment_length = int(sample_rate * SEGMENT_SECONDS)
+
+    weights = k_weighting(segment_length, sample_rate)
+    weights[1:-1] *= 2
+
+    energies = []
+    peak = 0.0
+    frames = 0
+
+    for chunk in chunks:
+        energies.append(segment_energies(chunk, weights, segment_length))
+        peak = max(peak, float(np.max(chunk, initial=0.0)), -float(np.min(chunk, initial=0.0)))
+        frames += len(chunk)
+
+    return {
+        "integrated": gated_loudness(np.concatenate(energies)) if energies else None,
+        "peak": 20 * math.log10(peak) if peak > 0 else None,
+        "duration": frames / sample_rate
+    }
+
+def integrated_loudness(samples: np.ndarray, sample_rate: int = SAMPLE_RATE):
+    return measure_loudness([samples], sample_rate)["integrated"]
+
+def analyse_loudness(path: Path):
+    return measure_loudness(stream_pcm(path, chunk_frames=int(SAMPLE_RATE * SEGMENT_SECONDS) * SEGMENTS_PER_CHUNK))
+
+def try_analyse_loudness(path: Path):
+    try:
+        return analyse_loudness(path)
+    except (subprocess.CalledProcessError, ValueError, OSError):
+        return None
+
+def analyse_files(paths: list[Path], cache_path: Path, workers: int = 1):
+    return map_cached(paths, cache_path, "loudness", try_analyse_loudness, workers=workers, desc="Analysing loudness")
+
+def normalization_gain(result, target: float = TARGET_LOUDNESS, ceiling: float = PEAK_CEILING):
+    if result is None or result.get("integrated") is None:
+        return None
+
+    gain = target - result["integrated"]
+
+    if result.get("peak") is not None:
+        gain = min(gain, ceiling - result["peak"])
+
+    return round(gain, 2)
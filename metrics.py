@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import atexit
+import bisect
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+PREFIX = "mparakeet"
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count > 0 else None,
+            "min": self.min,
+            "max": self.max,
+            "buckets": {str(bound): count for bound, count in zip((*self.buckets, "+Inf"), self.bucket_counts)}
+        }
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.tool = None
+        self.started = time.time()
+        self.export_path = None
+
+    def increment(self, name: str, amount: float = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float):
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+
+            self.histograms[name].observe(value)
+
+    @contextmanager
+    def timer(self, name: str):
+        start_time = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start_time)
+
+    def summary(self):
+        with self.lock:
+            return {
+                "tool": self.tool,
+                "started": self.started,
+                "duration_seconds": time.time() - self.started,
+                "counters": dict(self.counters),
+                "histograms": {name: histogram.summary() for name, histogram in self.histograms.items()}
+            }
+
+    def prometheus(self):
+        summary = self.summary()
+        labels = f'tool="{self.tool}"'
+        lines = []
+
+        def add(name, kind, samples):
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            lines.extend(f"{PREFIX}_{sample_name}{{{sample_labels}}} {value}" for sample_name, sample_labels, value in samples)
+
+        add("last_run_timestamp_seconds", "gauge", [("last_run_timestamp_seconds", labels, summary["started"])])
+        add("run_duration_seconds", "gauge", [("run_duration_seconds", labels, summary["duration_seconds"])])
+
+        for name, value in sorted(summary["counters"].items()):
+            add(f"{name}_total", "counter", [(f"{name}_total", labels, value)])
+
+        for name, histogram in sorted(summary["histograms"].items()):
+            cumulative = 0
+            samples = []
+
+            for bound, count in histogram["buckets"].items():
+                cumulative += count
+                samples.append((f"{name}_seconds_bucket", f'{labels},le="{bound}"', cumulative))
+
+            samples.append((f"{name}_seconds_sum", labels, histogram["sum"]))
+            samples.append((f"{name}_seconds_count", labels, histogram["count"]))
+
+            add(f"{name}_seconds", "histogram", samples)
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path):
+        text = self.prometheus() if path.suffix == ".prom" else json.dumps(self.summary(), indent=1)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = path.with_name(f".{path.name}.part")
+        partial_path.write_text(text, encoding="utf-8")
+        os.replace(partial_path, path)
+
+    def export_at_exit(self, path, tool: str):
+        self.tool = tool
+
+        if path is None or str(path).strip() == "":
+            return
+
+        if self.export_path is None:
+            atexit.register(lambda: self.write(self.export_path))
+
+        self.export_path = Path(path)
+
+metrics = Metrics()
@@ -1,59 +1,151 @@
 import re
 import time
-from pathlib import Path
+from collections import Counter
+from functools import lru_cache
 
 from colorama import Fore, Style
-from mutagen.mp3 import MP3
-from pyfzf import FzfPrompt
+
+from track import Track
+from grouptree import GroupTree, combine
+from picker import FzfPicker
+
+LENGTH = 0
+BREAKS = 1
+GROUPED = 2
+TRIMMED = 3
+
+def measure_group(group, trimmed_lengths=None):
+    length = 0
+    trimmed = 0
+    breaks = 0
+
+    for track in group:
+        if isinstance(track, Track):
+            length += round(track.length)
+            trimmed += round(trimmed_lengths.get(track.path, track.length)) if trimmed_lengths else round(track.length)
+        else:
+            breaks += 1
+
+    return length, breaks, 1 if len(group) > 1 else 0, trimmed
+
+@lru_cache(maxsize=4096)
+def parse_break_cutoff(track_break: str):
+    time_values = track_break.split(" ")[1].split(":")
+
+    break_time_cutoff: int = 0
+
+    if len(time_values) == 1:
+        break_time_cutoff = int(time_values[0])
+    elif len(time_values) == 2:
+        break_time_cutoff = int(time_values[0]) * 60 + int(time_values[1])
+    elif len(time_values) == 3:
+        break_time_cutoff = int(time_values[0]) * 60 * 60 + int(time_values[1]) * 60 + int(time_values[2])
+
+    return break_time_cutoff
+
+@lru_cache(maxsize=4096)
+def format_duration(seconds: float):
+    return time.strftime("%H:%M:%S", time.gmtime(seconds))
+
+@lru_cache(maxsize=4096)
+def side_name(section_num: int):
+    name = ""
+    section_num += 1
+
+    while section_num > 0:
+        section_num, letter = divmod(section_num - 1, len(alphabet))
+        name = alphabet[letter] + name
+
+    return name.upper()
+
+@lru_cache(maxsize=16384)
+def pad_title(title: str, width: int):
+    return title.ljust(width, '.')
 
 class Mix:
     mix_title = ""
-    track_groups: list[list] = []
+    track_groups: GroupTree
+    title_lengths: Counter
+    page_size: int | None = 200
+    search_picker: FzfPicker | None = None
+    trimmed_lengths: dict[str, float]
+    show_trimmed = False
 
     def __init__(self, mix_title):
         self.mix_title = mix_title
+        self.trimmed_lengths = {}
+        self.track_groups = GroupTree(measure=self.measure_group)
+        self.title_lengths = Counter()
+
+    def measure_group(self, group):
+        return measure_group(group, self.trimmed_lengths)
+
+    def set_trimmed_lengths(self, trimmed_lengths):
+        self.trimmed_lengths = trimmed_lengths
+        self.track_groups.remeasure()
+
+    def length_field(self):
+        return TRIMMED if self.show_trimmed else LENGTH
+
+    def exact_length(self, track: Track):
+        return self.trimmed_lengths.get(track.path, track.length) if self.show_trimmed else track.length
+
+    def track_length(self, track: Track):
+        return round(self.exact_length(track))
+
+    def count_title(self, track, amount):
+        if isinstance(track, Track):
+            self.title_lengths[len(track.title)] += amount
+
+            if self.title_lengths[len(track.title)] <= 0:
+                del self.title_lengths[len(track.title)]
 
     def add_track_or_break(self, new_track):
-        self.track_groups.append([new_track])
+        self.track_groups.insert(len(self.track_groups), [new_track])
+        self.count_title(new_track, 1)
+
+    def replace_groups(self, groups):
+        self.track_groups = GroupTree(measure=self.measure_group)
+
+        for group in groups:
+            self.track_groups.insert(len(self.track_groups), group)
 
     def get_tracks(self):
         flattened_tracks = [item for sublist in self.track_groups for item in sublist]
         return flattened_tracks
 
-        # return self.tracks
-
     def track_count(self):
-        return len(self.get_tracks())
-
-    def track_location_by_abs_index(self, track_index):
-        index = 0
-        for group_index, track_group in enumerate(self.track_groups):
-            for local_index, _ in enumerate(track_group):
-                if index == track_index:
-                    return group_index, local_index
+        return self.track_groups.track_count()
 
-                index += 1
+    def track_at(self, track_index):
+        return self.track_groups.track_at(track_index)
 
-        return -1, -1
+    def track_location_by_abs_index(self, track_index):
+        return self.track_groups.locate(track_index)
 
     def group_length(self, group_index):
         return len(self.track_groups[group_index])
 
+    def confirm_group_insert(self, move_track, move_to_track):
+        return input(
+            f"Do you want to insert {Fore.YELLOW}{self.get_track_title(move_track)}{Style.RESET_ALL} into "
+            f"{Fore.YELLOW}{self.get_track_title(move_to_track)}'s{Style.RESET_ALL} group? (y/n): ").lower() == "y"
+
     def move_track(self, from_index, to_index, force_group=False):
         if from_index == to_index:
             return
 
-        group_index, local_index = self.track_location_by_abs_index(from_index)
-        move_track = self.track_groups[group_index][local_index]
-        move_to_track = self.get_tracks()[to_index]
+        move_track = self.track_at(from_index)
 
-        self.remove_track(from_index)
+        self.track_groups.remove_track(*self.track_location_by_abs_index(from_index))
 
         if to_index <= 0:
             self.track_groups.insert(0, [move_track])
             return
 
-        to_index = self.get_tracks().index(move_to_track)
+        if from_index < to_index:
+            to_index -= 1
+
         move_to_group_index, move_to_local_index = self.track_location_by_abs_index(to_index)
 
         move_to_track_group = self.track_groups[move_to_group_index]
@@ -63,14 +155,12 @@ class Mix:
         else:
             if move_to_local_index == len(move_to_track_group) - 1:
                 if not force_group:
-                    do_insert = input(
-                        f"Do you want to insert {Fore.YELLOW}{self.get_track_title(move_track)}{Style.RESET_ALL} into "
-                        f"{Fore.YELLOW}{self.get_track_title(move_to_track)}'s{Style.RESET_ALL} group? (y/n): ").lower()
+                    do_insert = self.confirm_group_insert(move_track, move_to_track_group[move_to_local_index])
                 else:
                     do_insert = True
 
                 if do_insert:
-                    move_to_track_group.insert(move_to_local_index + 1, move_track)
+                    self.track_groups.insert_track(move_to_group_index, move_to_local_index + 1, move_track)
                 else:
                     self.track_groups.insert(move_to_group_index + 1, [move_track])
             else:
@@ -86,31 +176,63 @@ class Mix:
         first_track_group_index, first_track_local_index = self.track_location_by_abs_index(first_track_index)
         second_track_group_index, second_track_local_index = self.track_location_by_abs_index(second_track_index)
 
-        (self.track_groups[first_track_group_index][first_track_local_index],
-         self.track_groups[second_track_group_index][second_track_local_index]) = (
-            self.track_groups[second_track_group_index][second_track_local_index],
-            self.track_groups[first_track_group_index][first_track_local_index])
+        first_track = self.track_groups[first_track_group_index][first_track_local_index]
+        second_track = self.track_groups[second_track_group_index][second_track_local_index]
+
+        self.track_groups.set_track(first_track_group_index, first_track_local_index, second_track)
+        self.track_groups.set_track(second_track_group_index, second_track_local_index, first_track)
 
     def remove_track(self, track_index):
         group_index, local_index = self.track_location_by_abs_index(track_index)
 
-        del self.track_groups[group_index][local_index]
-
-        if self.group_length(group_index) <= 0:
-            del self.track_groups[group_index]
+        self.count_title(self.track_groups[group_index][local_index], -1)
+        self.track_groups.remove_track(group_index, local_index)
 
     def get_track_title(self, track):
-        if isinstance(track, MP3):
-            return track.get('Title', Path(track.filename).stem)[0]
+        if isinstance(track, Track):
+            return track.title
 
         return track
 
-    def display(self):
-        longest_title = max(
-            len(song.get('Title', Path(song.filename).stem)[0]) for song in self.get_tracks() if isinstance(song, MP3)) + 20
-        section_num = 0
-        section_length: float = 0
-        total_length: float = 0
+    def page_count(self):
+        if self.page_size is None:
+            return 1
+
+        return max(1, -(-self.track_count() // self.page_size))
+
+    def length_before(self, track_index):
+        group_index, local_index = self.track_location_by_abs_index(track_index)
+
+        if group_index < 0:
+            return self.track_groups.summary()
+
+        return combine(self.track_groups.prefix(group_index), self.measure_group(self.track_groups[group_index][:local_index]))
+
+    def section_start_length(self, section_num):
+        if section_num <= 0:
+            return 0
+
+        break_group_index = self.track_groups.select(BREAKS, section_num - 1)
+        break_group = self.track_groups[break_group_index]
+        before = self.track_groups.prefix(break_group_index)
+
+        remaining_breaks = section_num - 1 - before[BREAKS]
+
+        for local_index, track in enumerate(break_group):
+            if not isinstance(track, Track):
+                if remaining_breaks <= 0:
+                    return before[self.length_field()] + self.measure_group(break_group[:local_index])[self.length_field()]
+
+                remaining_breaks -= 1
+
+        return before[self.length_field()]
+
+    def display(self, page=0):
+        longest_title = max(self.title_lengths, default=0) + 20
+
+        track_count = self.track_count()
+        first_index = 0 if self.page_size is None else page * self.page_size
+        last_index = track_count if self.page_size is None else min(track_count, first_index + self.page_size)
 
         index_format, padding = self.get_formatting()
 
@@ -119,69 +241,72 @@ class Mix:
         print(
             f"{padding}{Fore.GREEN}{self.mix_title}\n\n{Style.RESET_ALL}{Fore.YELLOW}{padding}{title_a.ljust(longest_title)} {title_b}{Style.RESET_ALL}")
 
-        index = 0
-        group_number = 0
-        for track_group in self.track_groups:
-            is_group = len(track_group) > 1
+        if self.page_count() > 1:
+            print(f"{padding}{Fore.YELLOW}Page {page + 1}/{self.page_count()} ({first_index + 1}-{last_index} of {track_count}){Style.RESET_ALL}")
 
-            for track in track_group:
-                index_str = f"{index + 1:{index_format}}."
+        index = first_index
 
-                if not isinstance(track, MP3):
-                    break_time_cutoff_raw = track.split(" ")[1]
+        if index < last_index:
+            group_index, local_index = self.track_location_by_abs_index(index)
+            before = self.length_before(index)
 
-                    time_values = break_time_cutoff_raw.split(":")
+            section_num = before[BREAKS]
+            section_length: float = before[self.length_field()] - self.section_start_length(section_num)
+            group_number = self.track_groups.prefix(group_index)[GROUPED]
 
-                    break_time_cutoff: int = 0
+            for track_group in self.track_groups.iter_from(group_index):
+                is_group = len(track_group) > 1
 
-                    if len(time_values) == 1:
-                        break_time_cutoff = int(time_values[0])
-                    elif len(time_values) == 2:
-                        break_time_cutoff = int(time_values[0]) * 60 + int(time_values[0])
-                    elif len(time_values) == 3:
-                        break_time_cutoff = int(time_values[0]) * 60 * 60 + int(time_values[1]) * 60 + int(time_values[2])
+                for track in track_group[local_index:]:
+                    if index >= last_index:
+                        break
 
-                    time_difference = abs(break_time_cutoff - section_length)
-                    section_length_ok = section_length <= break_time_cutoff
-                    difference_sign = "-" if section_length_ok else "+"
+                    index_str = f"{index + 1:{index_format}}."
 
-                    color = Fore.GREEN if section_length_ok else Fore.RED
+                    if not isinstance(track, Track):
+                        break_time_cutoff = parse_break_cutoff(track)
 
-                    time_struct = time.gmtime(time_difference)
-                    section_length_as_str = time.strftime("%H:%M:%S", time_struct)
+                        time_difference = abs(break_time_cutoff - section_length)
+                        section_length_ok = section_length <= break_time_cutoff
+                        difference_sign = "-" if section_length_ok else "+"
 
-                    part_name = f"{alphabet[section_num].upper()} Side"
+                        color = Fore.GREEN if section_length_ok else Fore.RED
 
-                    if is_group:
-                        print(f"{Fore.YELLOW}{index_str} {colors[group_number % len(colors)]}{part_name.ljust(longest_title, '.')}{Style.RESET_ALL} {color}{difference_sign}{section_length_as_str}{Style.RESET_ALL} ")
-                    else:
-                        print(f"{Fore.YELLOW}{index_str} {part_name.ljust(longest_title, '.')}{Style.RESET_ALL} {color}{difference_sign}{section_length_as_str}{Style.RESET_ALL} ")
+                        section_length_as_str = format_duration(time_difference)
 
-                    section_num += 1
-                    section_length = 0
-                else:
-                    song_title = track.get('Title', Path(track.filename).stem)[0]
-                    song_length = track.info.length
-                    time_struct = time.gmtime(song_length)
-                    song_length_as_str = time.strftime("%H:%M:%S", time_struct)
+                        part_name = pad_title(f"{side_name(section_num)} Side", longest_title)
 
-                    section_length += song_length
-                    total_length += song_length
+                        if is_group:
+                            print(f"{Fore.YELLOW}{index_str} {colors[group_number % len(colors)]}{part_name}{Style.RESET_ALL} {color}{difference_sign}{section_length_as_str}{Style.RESET_ALL} ")
+                        else:
+                            print(f"{Fore.YELLOW}{index_str} {part_name}{Style.RESET_ALL} {color}{difference_sign}{section_length_as_str}{Style.RESET_ALL} ")
 
-                    if is_group:
-                        print(f"{index_str} {colors[group_number % len(colors)]}{song_title.replace("： ", ": ").ljust(longest_title, '.')}{Style.RESET_ALL} ({song_length_as_str})")
+                        section_num += 1
+                        section_length = 0
                     else:
-                        print(f"{index_str} {song_title.replace("： ", ": ").ljust(longest_title, '.')} ({song_length_as_str})")
+                        song_title = pad_title(track.title.replace("： ", ": "), longest_title)
+                        song_length_as_str = format_duration(self.track_length(track))
 
-                index += 1
+                        section_length += self.track_length(track)
 
-            if is_group:
-                group_number += 1
+                        if is_group:
+                            print(f"{index_str} {colors[group_number % len(colors)]}{song_title}{Style.RESET_ALL} ({song_length_as_str})")
+                        else:
+                            print(f"{index_str} {song_title} ({song_length_as_str})")
 
-        time_struct = time.gmtime(total_length)
-        total_length_as_str = time.strftime("%H:%M:%S", time_struct)
+                    index += 1
 
-        length_prompt = "Total"
+                local_index = 0
+
+                if is_group:
+                    group_number += 1
+
+                if index >= last_index:
+                    break
+
+        total_length_as_str = format_duration(self.track_groups.summary()[self.length_field()])
+
+        length_prompt = "Total without silence" if self.show_trimmed else "Total"
         print(f"{padding}{length_prompt.ljust(longest_title, '.')} ({total_length_as_str})\n")
 
     def get_formatting(self):
@@ -205,13 +330,13 @@ class Mix:
         for i, song in enumerate(self.get_tracks()):
             index_str = f"{i + 1:{index_format}}. " if include_indices else ""
 
-            if not isinstance(song, MP3):
-                part_name = f"{index_str}{alphabet[section_num].upper()} Side"
+            if not isinstance(song, Track):
+                part_name = f"{index_str}{side_name(section_num)} Side"
                 result.append(part_name)
 
                 section_num += 1
             else:
-                song_title = song.get('Title', Path(song.filename).stem)[0]
+                song_title = song.title
                 song_title_formatted = f"{index_str}{song_title}"
                 result.append(song_title_formatted)
 
@@ -220,7 +345,7 @@ class Mix:
     BACK_TO_MIX = ".back_to_mix"
     BEGINNING_OF_MIX = ".beginning"
 
-    def prompt_track_selection(self, action_prompt="", include_beginning=False):
+    def prompt_track_selection(self, action_prompt="", include_beginning=False, allow_paging=False):
         if action_prompt.strip() != "":
             action_prompt = f"{action_prompt.strip()} "
 
@@ -230,12 +355,17 @@ class Mix:
 
         min_choice = 0 if include_beginning else 1
 
+        allow_paging = allow_paging and self.page_count() > 1
+        paging_prompt = "[N]ext Page, [P]revious Page, " if allow_paging else ""
+
         while choice_index < (min_choice - 1) or choice_index >= mix_length:
             mix_choice_input = input(
-                f"Select a track or break {action_prompt}using {min_choice}-{mix_length}, [S]earch Mix, or [E]xit: ").lower()
+                f"Select a track or break {action_prompt}using {min_choice}-{mix_length}, {paging_prompt}[S]earch Mix, or [E]xit: ").lower()
 
             if mix_choice_input == "e":
                 return "e", None
+            elif allow_paging and mix_choice_input in ("n", "p"):
+                return mix_choice_input, None
             elif mix_choice_input == "s":
                 track_names = self.track_names(include_indices=True)
 
@@ -246,9 +376,12 @@ class Mix:
 
                 options.append(Mix.BACK_TO_MIX)
 
-                fzf = FzfPrompt()
+                if self.search_picker is None:
+                    self.search_picker = FzfPicker(options)
+                else:
+                    self.search_picker.update(options)
 
-                selected = fzf.prompt(options, fzf_options='--cycle')
+                selected = self.search_picker.prompt()
 
                 if len(selected) != 1:
                     continue
@@ -269,11 +402,11 @@ class Mix:
                     pass
 
         if choice_index >= 0 and choice_index < self.track_count():
-            selection = self.get_tracks()[choice_index]
+            selection = self.track_at(choice_index)
         else:
             selection = None
 
         return selection, choice_index
 
-alphabet = "abcdefghijklknopqrstuvwxyz"
+alphabet = "abcdefghijklmnopqrstuvwxyz"
 colors = [ Fore.LIGHTRED_EX, Fore.LIGHTGREEN_EX, Fore.LIGHTCYAN_EX, Fore.LIGHTMAGENTA_EX ]
\ No newline at end of file
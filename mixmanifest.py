@@ -0,0 +1,29 @@
+import os
+import json
+from pathlib import Path
+
+MANIFEST_FILENAME = ".mix_manifest.json"
+MANIFEST_VERSION = 1
+
+def write_mix_manifest(mix_path: Path, entries: list[dict]):
+    manifest_path = mix_path / MANIFEST_FILENAME
+    temp_path = manifest_path.with_suffix(".tmp")
+
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump({"version": MANIFEST_VERSION, "entries": entries}, file, ensure_ascii=False, indent=1)
+
+    os.replace(temp_path, manifest_path)
+
+def read_mix_manifest(mix_path: Path):
+    manifest_path = mix_path / MANIFEST_FILENAME
+
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return []
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return []
+
+    return manifest.get("entries", [])
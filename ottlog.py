@@ -1,34 +1,137 @@
-import logging.config
-
-logging.config.dictConfig(
-    {
-        "version": 1,
-        "disable_existing_loggers": False,
-        "formatters": {
-            "simple": {
-                "format": "[%(asctime)s .%(msecs)03d|%(levelname)s|%(name)s|%(filename)s:%(lineno)d] %(message)s",
-                "datefmt": "%Y-%m-%dT%H:%M:%S%z",
-            }
-        },
-        "handlers": {
-            "stdout": {
-                "class": "logging.StreamHandler",
-                "formatter": "simple",
-                "stream": "ext://sys.stdout",
-                # "level": "WARNING",
-                # "level": "INFO",
-                "level": "DEBUG",
-            },
-        },
-        "loggers": {
-            "root": {
-                "level": "DEBUG",
-                "handlers": [
-                    "stdout",
-                ],
-            }
-        },
-    }
-)
-
-logger = logging.getLogger("createmix")
\ No newline at end of file
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import configparser
+import logging.handlers
+
+from tqdm import tqdm
+
+CONFIG_FILENAME = "config.ini"
+CONFIG_SECTION = "logging"
+TEXT_FORMAT = "[%(asctime)s .%(msecs)03d|%(levelname)s|%(name)s|%(filename)s:%(lineno)d] %(message)s"
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+class TqdmHandler(logging.StreamHandler):
+    def emit(self, record):
+        try:
+            tqdm.write(self.format(record), file=self.stream)
+        except Exception:
+            self.handleError(record)
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        }
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, ensure_ascii=False)
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self, limit: int, interval: float):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.windows = {}
+
+    def filter(self, record):
+        key = (record.pathname, record.lineno, record.levelno)
+        now = time.monotonic()
+
+        with self.lock:
+            window_start, count, suppressed = self.windows.get(key, (now, 0, 0))
+
+            if now - window_start >= self.interval:
+                window_start, count = now, 0
+
+            if count >= self.limit:
+                self.windows[key] = (window_start, count, suppressed + 1)
+                return False
+
+            self.windows[key] = (window_start, count + 1, 0)
+
+        if suppressed > 0:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+
+        return True
+
+def read_logging_config(config_filename=CONFIG_FILENAME):
+    config = configparser.ConfigParser()
+    config.read(config_filename, encoding="utf-8")
+
+    return config[CONFIG_SECTION] if config.has_section(CONFIG_SECTION) else {}
+
+def make_sink(sink: str, formatter: logging.Formatter):
+    if sink == "stdout":
+        handler = TqdmHandler(sys.stdout)
+    elif sink == "stderr":
+        handler = TqdmHandler(sys.stderr)
+    elif sink.startswith("file:"):
+        handler = logging.FileHandler(sink[len("file:"):], encoding="utf-8")
+    else:
+        raise ValueError(f"{sink} is not a logging sink")
+
+    handler.setFormatter(formatter)
+
+    return handler
+
+def setup_logging(config_filename=CONFIG_FILENAME):
+    settings = read_logging_config(config_filename)
+
+    level = settings.get("level", "DEBUG").strip().upper()
+    use_json = settings.get("json", "false").strip().lower() in ("1", "yes", "true", "on")
+    rate_limit = int(settings.get("ratelimit", "0"))
+    rate_interval = float(settings.get("rateinterval", "10"))
+
+    formatter = JsonFormatter() if use_json else logging.Formatter(TEXT_FORMAT, DATE_FORMAT)
+    sinks = [make_sink(sink.strip(), formatter) for sink in settings.get("sinks", "stdout").split(",") if sink.strip() != ""]
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+
+    if rate_limit > 0:
+        queue_handler.addFilter(RateLimitFilter(rate_limit, rate_interval))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, *sinks, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    def log_directly_in_child():
+        root.removeHandler(queue_handler)
+
+        for sink in sinks:
+            if isinstance(sink, TqdmHandler):
+                sink = logging.StreamHandler(sink.stream)
+                sink.setFormatter(formatter)
+
+            for log_filter in queue_handler.filters:
+                sink.addFilter(log_filter)
+
+            root.addHandler(sink)
+
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=log_directly_in_child)
+
+    return listener
+
+listener = setup_logging()
+
+logger = logging.getLogger("createmix")
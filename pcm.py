@@ -0,0 +1,78 @@
+import struct
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+SAMPLE_RATE = 48000
+CHUNK_FRAMES = 480000
+
+def read_exactly(stream, size: int):
+    data = stream.read(size)
+
+    if len(data) < size:
+        raise ValueError("ffmpeg's WAV stream ended early")
+
+    return data
+
+def read_wav_header(stream):
+    header = read_exactly(stream, 12)
+
+    if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        raise ValueError("ffmpeg didn't produce a WAV stream")
+
+    channels = None
+
+    while True:
+        chunk_id, chunk_size = struct.unpack("<4sI", read_exactly(stream, 8))
+
+        if chunk_id == b"data":
+            if channels is None:
+                raise ValueError("WAV stream has no format chunk")
+
+            return channels
+
+        body = read_exactly(stream, chunk_size + (chunk_size & 1))
+
+        if chunk_id == b"fmt ":
+            channels = struct.unpack("<H", body[2:4])[0]
+
+def stream_pcm(path: Path, sample_rate: int = SAMPLE_RATE, channels: int | None = None, chunk_frames: int = CHUNK_FRAMES):
+    command = ["ffmpeg", "-loglevel", "error", "-i", str(path), "-map", "0:a:0", "-ar", str(sample_rate)]
+
+    if channels is not None:
+        command.extend(["-ac", str(channels)])
+
+    command.extend(["-c:a", "pcm_f32le", "-f", "wav", "-"])
+
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    try:
+        channels = read_wav_header(process.stdout)
+        frame_size = 4 * channels
+
+        while True:
+            data = process.stdout.read(chunk_frames * frame_size)
+            data = data[:len(data) - len(data) % frame_size]
+
+            if len(data) <= 0:
+                break
+
+            yield np.frombuffer(data, dtype="<f4").reshape(-1, channels)
+    except ValueError:
+        if process.poll() is None:
+            process.kill()
+
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, command) from None
+
+        raise
+    except BaseException:
+        process.kill()
+        raise
+    finally:
+        process.stdout.close()
+        process.wait()
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command)
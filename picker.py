@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import shlex
+import shutil
+import signal
+import socket
+import weakref
+import secrets
+import tempfile
+import subprocess
+import http.client
+
+SESSION_PORT_VARIABLE = "MPARAKEET_PICKER_PORT"
+SESSION_TOKEN_VARIABLE = "MPARAKEET_PICKER_TOKEN"
+ACTION_DELIMITERS = ("()", "[]", "<>", "~~", "!!", "@@", "##", "%%", "^^", "&&", "**", ";;", "||")
+ACCEPT_KEYS = ("enter", "double-click")
+BAD_OPTION = 2
+
+def remove_file(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def shell_quote(argument: str):
+    return subprocess.list2cmdline([argument]) if sys.platform == "win32" else shlex.quote(argument)
+
+def fzf_action(name: str, argument: str):
+    for opening, closing in ACTION_DELIMITERS:
+        if opening not in argument and closing not in argument:
+            return f"{name}{opening}{argument}{closing}"
+
+    raise ValueError(f"Can't pass {argument} to fzf's {name} action")
+
+class FzfPicker:
+    def __init__(self, entries=(), fzf_options=("--cycle",)):
+        if shutil.which("fzf") is None:
+            raise SystemError("Cannot find 'fzf' installed on PATH.")
+
+        self.fzf_options = list(fzf_options)
+        self.entries = None
+        self.version = 0
+
+        file_descriptor, self.source_path = tempfile.mkstemp(prefix="mparakeet-", suffix=".txt")
+        os.close(file_descriptor)
+
+        self.finalizer = weakref.finalize(self, remove_file, self.source_path)
+
+        self.update(entries)
+
+    def update(self, entries):
+        entries = list(entries)
+
+        if entries == self.entries:
+            return
+
+        with open(self.source_path, "w", encoding="utf-8", newline="\n") as source:
+            source.write("\n".join(entries))
+
+        self.entries = entries
+        self.version += 1
+
+    def prompt(self):
+        with open(self.source_path, "rb") as source:
+            result = subprocess.run(["fzf", *self.fzf_options], stdin=source, stdout=subprocess.PIPE)
+
+        if result.returncode != 0:
+            return []
+
+        return [line for line in result.stdout.decode("utf-8").splitlines() if line != ""]
+
+    def selections(self):
+        token = secrets.token_hex(16)
+        server = socket.create_server(("127.0.0.1", 0))
+        server.settimeout(0.2)
+
+        environment = {**os.environ, SESSION_PORT_VARIABLE: str(server.getsockname()[1]), SESSION_TOKEN_VARIABLE: token, "FZF_API_KEY": token}
+        helper = " ".join(shell_quote(argument) for argument in (sys.executable, "-S", os.path.abspath(__file__))) + " {+f}"
+        command = ["fzf", *self.fzf_options, "--listen"]
+
+        for key in ACCEPT_KEYS:
+            command.extend(["--bind", f"{key}:{fzf_action('execute', helper)}+clear-query"])
+
+        process = None
+        fzf_port = None
+
+        try:
+            while True:
+                with open(self.source_path, "rb") as source:
+                    process = subprocess.Popen(command, stdin=source, stdout=subprocess.DEVNULL, env=environment)
+
+                while process.poll() is None:
+                    try:
+                        connection, _ = server.accept()
+                    except TimeoutError:
+                        continue
+
+                    with connection:
+                        connection.settimeout(5)
+                        request = json.loads(connection.makefile("r", encoding="utf-8").readline() or "{}")
+
+                        if request.get("token") != token:
+                            continue
+
+                        fzf_port = request["fzf_port"]
+                        version = self.version
+
+                        try:
+                            yield request["selected"]
+                        except GeneratorExit:
+                            self.post(fzf_port, token, "abort")
+                            raise
+                        finally:
+                            connection.sendall(b"\n")
+
+                    if self.version != version:
+                        reload = "type" if sys.platform == "win32" else "cat"
+                        self.post(fzf_port, token, fzf_action("reload-sync", f"{reload} {shell_quote(self.source_path)}"))
+
+                if process.returncode == BAD_OPTION:
+                    print("This fzf has no --listen support, so it will be restarted for every pick.")
+                    break
+        finally:
+            server.close()
+
+            if process is not None and process.poll() is None:
+                try:
+                    process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    process.terminate()
+                    process.wait()
+
+        while True:
+            yield self.prompt()
+
+    def post(self, fzf_port: int, token: str, action: str):
+        connection = http.client.HTTPConnection("127.0.0.1", fzf_port, timeout=5)
+
+        try:
+            connection.request("POST", "/", body=action.encode("utf-8"), headers={"x-api-key": token})
+            connection.getresponse().read()
+        except OSError:
+            pass
+        finally:
+            connection.close()
+
+    def close(self):
+        self.finalizer()
+
+def send_selection(selection_path: str):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    with open(selection_path, "r", encoding="utf-8") as selection:
+        selected = [line for line in selection.read().splitlines() if line != ""]
+
+    request = {"token": os.environ[SESSION_TOKEN_VARIABLE], "fzf_port": int(os.environ["FZF_PORT"]), "selected": selected}
+
+    with socket.create_connection(("127.0.0.1", int(os.environ[SESSION_PORT_VARIABLE]))) as connection:
+        connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        connection.makefile("rb").readline()
+
+if __name__ == "__main__":
+    send_selection(sys.argv[1])
@@ -0,0 +1,99 @@
+import os
+import hashlib
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from track import Track
+from silence import index_silence
+from ffmparakeet import partial_destination
+
+PREVIEW_DIRNAME = ".previews"
+MAX_CACHED_PREVIEWS = 500
+PREVIEW_FORMAT = "aformat=sample_fmts=fltp:sample_rates=44100:channel_layouts=stereo"
+
+def file_signature(path: str):
+    stat = os.stat(path)
+    return f"{path}:{stat.st_mtime_ns}:{stat.st_size}"
+
+class TransitionPreviews:
+    def __init__(self, cache_directory: Path, preview_length: float = 10, crossfade: float = 0, workers: int = 2, silence_cache: Path | None = None):
+        self.cache_directory = cache_directory
+        self.silence_cache = silence_cache
+        self.preview_length = preview_length
+        self.crossfade = min(crossfade, preview_length)
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="TransitionPreviews")
+        self.renders = {}
+
+        self.cache_directory.mkdir(parents=True, exist_ok=True)
+        self.prune()
+
+    def clip_path(self, ending: Track, starting: Track):
+        key = "|".join([file_signature(ending.path), file_signature(starting.path), str(self.preview_length), str(self.crossfade), str(self.silence_cache is not None)])
+        return self.cache_directory / f"{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}.mp3"
+
+    def audio_bounds(self, ending: Track, starting: Track):
+        if self.silence_cache is None:
+            return ending.length, 0.0
+
+        bounds = index_silence([Path(ending.path), Path(starting.path)], self.silence_cache)
+        ending_bounds, starting_bounds = bounds.get(Path(ending.path)), bounds.get(Path(starting.path))
+
+        return (ending_bounds["end"] if ending_bounds is not None else ending.length,
+                starting_bounds["start"] if starting_bounds is not None else 0.0)
+
+    def render(self, ending: Track, starting: Track, clip: Path):
+        if clip.is_file():
+            return clip
+
+        audio_end, audio_start = self.audio_bounds(ending, starting)
+
+        partial_clip = partial_destination(clip)
+
+        if self.crossfade > 0:
+            join = f"[a0][a1]acrossfade=d={self.crossfade}[out]"
+        else:
+            join = "[a0][a1]concat=n=2:v=0:a=1[out]"
+
+        command = ["ffmpeg", "-loglevel", "error",
+                   "-ss", str(max(0.0, audio_end - self.preview_length)), "-t", str(min(self.preview_length, audio_end)), "-i", ending.path,
+                   "-ss", str(audio_start), "-t", str(self.preview_length), "-i", starting.path,
+                   "-filter_complex", f"[0:a]{PREVIEW_FORMAT}[a0];[1:a]{PREVIEW_FORMAT}[a1];{join}",
+                   "-map", "[out]", "-codec:a", "libmp3lame", "-q:a", "4", "-f", "mp3", "-y", str(partial_clip)]
+
+        try:
+            subprocess.run(command, check=True)
+            os.replace(partial_clip, clip)
+        finally:
+            partial_clip.unlink(missing_ok=True)
+
+        return clip
+
+    def request(self, ending: Track, starting: Track):
+        clip = self.clip_path(ending, starting)
+        render = self.renders.get(clip)
+
+        if render is None or (render.done() and render.exception() is not None):
+            render = self.executor.submit(self.render, ending, starting, clip)
+            self.renders[clip] = render
+
+        return render
+
+    def prefetch(self, pairs):
+        for ending, starting in pairs:
+            try:
+                self.request(ending, starting)
+            except OSError:
+                pass
+
+    def get(self, ending: Track, starting: Track):
+        return self.request(ending, starting).result()
+
+    def prune(self, max_clips: int = MAX_CACHED_PREVIEWS):
+        clips = sorted(self.cache_directory.glob("*.mp3"), key=lambda clip: clip.stat().st_mtime, reverse=True)
+
+        for clip in clips[max_clips:]:
+            clip.unlink(missing_ok=True)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,56 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from tqdm import tqdm
+
+from filecache import FileCache
+
+def probe_audio(path: Path):
+    command = ["ffprobe", "-v", "error", "-select_streams", "a:0",
+               "-show_entries", "stream=codec_name,bit_rate:format=duration,bit_rate",
+               "-of", "json", str(path)]
+
+    result = json.loads(subprocess.run(command, check=True, capture_output=True).stdout)
+
+    streams = result.get("streams", [])
+    stream = streams[0] if streams else {}
+    container = result.get("format", {})
+
+    bit_rate = stream.get("bit_rate", container.get("bit_rate"))
+    duration = container.get("duration")
+
+    return {
+        "codec": stream.get("codec_name"),
+        "bit_rate": int(bit_rate) if bit_rate not in (None, "N/A") else None,
+        "duration": float(duration) if duration not in (None, "N/A") else None
+    }
+
+def try_probe_audio(path: Path):
+    try:
+        return probe_audio(path)
+    except (subprocess.CalledProcessError, ValueError, OSError):
+        return None
+
+def probe_files(paths: list[Path], cache_path: Path, workers: int = 1):
+    if shutil.which("ffprobe") is None:
+        return None
+
+    cache = FileCache(cache_path, "probe")
+
+    try:
+        probes = {path: cache.get(path) for path in paths}
+        missing = [path for path, info in probes.items() if info is None]
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            results = list(tqdm(executor.map(try_probe_audio, missing), total=len(missing), desc="Probing files", unit="file", ncols=100, disable=len(missing) <= 0))
+
+        probed = [(path, info) for path, info in zip(missing, results) if info is not None]
+        probes.update(probed)
+        cache.put_many(probed)
+    finally:
+        cache.close()
+
+    return probes
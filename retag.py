@@ -0,0 +1,45 @@
+import os
+from pathlib import Path
+
+from mutagen.easyid3 import EasyID3
+from mutagen.id3 import ID3, ID3NoHeaderError, TXXX
+
+from fastcopy import copy_file
+from ffmparakeet import partial_destination
+
+def write_mp3_tags(path, title: str, album: str = "", track_num: int = -1):
+    try:
+        tags = EasyID3(path)
+    except ID3NoHeaderError:
+        tags = EasyID3()
+
+    tags["title"] = title
+
+    if track_num >= 0:
+        tags["tracknumber"] = str(track_num)
+
+    if album.strip() != "":
+        tags["album"] = album
+
+    tags.save(path, v2_version=3)
+
+def write_replaygain(path, gain_db: float):
+    tags = ID3(path)
+    tags.add(TXXX(encoding=3, desc="REPLAYGAIN_TRACK_GAIN", text=[f"{gain_db:.2f} dB"]))
+    tags.save(path, v2_version=3)
+
+def copy_with_tags(source: Path, destination: Path, title: str, album: str = "", track_num: int = -1, gain_db: float | None = None):
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = partial_destination(destination)
+
+    try:
+        copy_file(source, partial_path)
+        write_mp3_tags(partial_path, title, album=album, track_num=track_num)
+
+        if gain_db is not None:
+            write_replaygain(partial_path, gain_db)
+        os.replace(partial_path, destination)
+    finally:
+        partial_path.unlink(missing_ok=True)
+
+    return destination
@@ -0,0 +1,72 @@
+import json
+import time
+import itertools
+from pathlib import Path
+from dataclasses import dataclass, asdict
+
+COPY_BYTES_PER_SECOND = 200_000_000
+ENCODE_AUDIO_SECONDS_PER_SECOND = 40
+ENCODE_BYTES_PER_SECOND = 2_000_000
+SMALL_FILE_BYTES = 4_000_000
+
+@dataclass (frozen=True)
+class JobTiming:
+    source_path: str
+    estimated_cost: float
+    queue_wait: float
+    run_time: float
+
+def estimate_cost(source_path: Path, probe, stream_copy: bool):
+    size = source_path.stat().st_size
+
+    if stream_copy:
+        return size / COPY_BYTES_PER_SECOND
+
+    if probe is not None and probe.get("duration") is not None:
+        return probe["duration"] / ENCODE_AUDIO_SECONDS_PER_SECOND
+
+    return size / ENCODE_BYTES_PER_SECOND
+
+def longest_first(jobs: list, costs: dict):
+    return sorted(jobs, key=lambda job: costs[job], reverse=True)
+
+def batch_jobs(jobs: list, sizes: dict, batch_size: int, batchable=lambda job: True, small_file_bytes: int = SMALL_FILE_BYTES):
+    if batch_size <= 1:
+        return [(job,) for job in jobs]
+
+    small_jobs = [job for job in jobs if batchable(job) and sizes[job] <= small_file_bytes]
+    small_job_set = set(small_jobs)
+
+    batches = [(job,) for job in jobs if job not in small_job_set]
+    batches.extend(itertools.batched(small_jobs, batch_size))
+
+    return batches
+
+def run_timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+
+    return result, started, time.perf_counter()
+
+def report_timings(timings: list[JobTiming], wall_time: float, workers: int, report_path: Path | None = None, slowest: int = 5):
+    busy_time = sum(timing.run_time for timing in timings)
+    utilization = busy_time / (wall_time * workers) if wall_time > 0 and workers > 0 else 0
+
+    print(f"Wall time {wall_time:.1f}s, busy time {busy_time:.1f}s across {workers} worker(s), {utilization:.0%} pool utilization")
+
+    if len(timings) > 0:
+        average_wait = sum(timing.queue_wait for timing in timings) / len(timings)
+        print(f"Average job {busy_time / len(timings):.2f}s, average queue wait {average_wait:.2f}s")
+
+        for timing in sorted(timings, key=lambda timing: timing.run_time, reverse=True)[:slowest]:
+            print(f"  {timing.run_time:8.2f}s (estimated {timing.estimated_cost:.2f}s) {timing.source_path}")
+
+    if report_path is not None:
+        with open(report_path, "w", encoding="utf-8") as file:
+            json.dump({
+                "wall_time": wall_time,
+                "busy_time": busy_time,
+                "workers": workers,
+                "utilization": utilization,
+                "jobs": [asdict(timing) for timing in timings]
+            }, file, indent=1)
@@ -4,12 +4,25 @@ from pathlib import Path
 
 from ottlog import logger
 
+def to_bool(value):
+    if isinstance(value, bool):
+        return value
+
+    if str(value).strip().lower() in ("1", "yes", "true", "on"):
+        return True
+    elif str(value).strip().lower() in ("0", "no", "false", "off"):
+        return False
+
+    raise ValueError(f"{value} is not a boolean")
+
 def get_config_param(config_filename, config_section, cast_to, param_name):
+    if param_name not in config_section:
+        return None
+
     try:
         return cast_to(config_section[param_name])
-    except:
-        error = f"{param_name} not found in {config_filename}."
-        logger.exception(error)
+    except ValueError:
+        logger.error(f"Couldn't read {param_name}={config_section[param_name]} from {config_filename}.")
 
         return None
 
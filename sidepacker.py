@@ -0,0 +1,155 @@
+from mix import Mix, parse_break_cutoff
+from track import Track
+
+NODE_LIMIT = 200_000
+
+def best_subset(weights: list[int], capacity: int):
+    mask = (1 << (capacity + 1)) - 1
+    reachable = [1]
+
+    for weight in weights:
+        reachable.append((reachable[-1] | (reachable[-1] << weight)) & mask)
+
+        if reachable[-1] >> capacity & 1:
+            break
+
+    total = reachable[-1].bit_length() - 1
+    best = total
+    chosen = []
+
+    for index in range(len(reachable) - 2, -1, -1):
+        if not reachable[index] >> total & 1:
+            chosen.append(index)
+            total -= weights[index]
+
+    return best, chosen[::-1]
+
+def fill_in_order(lengths: list[int], capacities: list[int]):
+    assignment = [-1] * len(lengths)
+
+    for side, capacity in enumerate(capacities):
+        fits = [index for index, length in enumerate(lengths) if assignment[index] < 0 and length <= capacity]
+        _, chosen = best_subset([lengths[index] for index in fits], capacity)
+
+        for index in chosen:
+            assignment[fits[index]] = side
+
+    return assignment
+
+def reachable_below(reachable: int, limit: int):
+    return (reachable & ((1 << (limit + 1)) - 1)).bit_length() - 1
+
+def best_assignment(lengths: list[int], capacities: list[int], node_limit: int = NODE_LIMIT):
+    order = sorted(range(len(lengths)), key=lambda index: -lengths[index])
+    weights = [lengths[index] for index in order]
+    free = sum(capacities)
+
+    suffixes = [1] * (len(weights) + 1)
+
+    for index in range(len(weights) - 1, -1, -1):
+        suffixes[index] = (suffixes[index + 1] | (suffixes[index + 1] << weights[index])) & ((1 << (free + 1)) - 1)
+
+    def bound(index):
+        return min(reachable_below(suffixes[index], free), sum(reachable_below(suffixes[index], capacity) for capacity in residual))
+
+    residual = list(capacities)
+    upper_bound = bound(0)
+
+    initial = fill_in_order(lengths, capacities)
+    best = [initial[index] for index in order]
+    best_packed = sum(weight for weight, side in zip(weights, best) if side >= 0)
+
+    assignment = [-1] * len(weights)
+    options = [[] for _ in weights]
+    positions = [0] * len(weights)
+    packed = 0
+    nodes = 0
+
+    def choices(index):
+        seen = set()
+        sides = []
+
+        for side, capacity in enumerate(residual):
+            if weights[index] <= capacity and capacity not in seen:
+                seen.add(capacity)
+                sides.append(side)
+
+        return [*sides, -1]
+
+    depth = 0 if weights else -1
+
+    if depth >= 0:
+        options[0] = choices(0)
+
+    while depth >= 0 and best_packed < upper_bound and nodes < node_limit:
+        if positions[depth] > 0 and assignment[depth] >= 0:
+            residual[assignment[depth]] += weights[depth]
+            packed -= weights[depth]
+            free += weights[depth]
+            assignment[depth] = -1
+
+        if positions[depth] >= len(options[depth]):
+            depth -= 1
+            continue
+
+        side = options[depth][positions[depth]]
+        positions[depth] += 1
+        nodes += 1
+
+        if side >= 0:
+            assignment[depth] = side
+            residual[side] -= weights[depth]
+            packed += weights[depth]
+            free -= weights[depth]
+
+        if packed > best_packed:
+            best_packed = packed
+            best = assignment[:depth + 1] + [-1] * (len(weights) - depth - 1)
+
+        if depth + 1 >= len(weights) or packed + bound(depth + 1) <= best_packed:
+            continue
+
+        depth += 1
+        options[depth] = choices(depth)
+        positions[depth] = 0
+
+    result = [-1] * len(lengths)
+
+    for index, side in zip(order, best):
+        result[index] = side
+
+    return result
+
+def pack_sides(units: list, lengths: list[int], capacities: list[int]):
+    assignment = best_assignment(lengths, capacities)
+
+    sides = []
+
+    for side, capacity in enumerate(capacities):
+        indices = [index for index, assigned in enumerate(assignment) if assigned == side]
+        sides.append(([units[index] for index in indices], capacity - sum(lengths[index] for index in indices)))
+
+    return sides, [unit for unit, assigned in zip(units, assignment) if assigned < 0]
+
+def pack_mix(mix: Mix):
+    groups = list(mix.track_groups)
+
+    if any(len(group) > 1 and any(not isinstance(track, Track) for track in group) for group in groups):
+        raise ValueError("breaks can't be packed while they are grouped with tracks")
+
+    breaks = [group for group in groups if not isinstance(group[0], Track)]
+    units = [group for group in groups if isinstance(group[0], Track)]
+
+    lengths = [sum(mix.track_length(track) for track in group) for group in units]
+    sides, leftover = pack_sides(units, lengths, [parse_break_cutoff(group[0]) for group in breaks])
+
+    packed_groups = []
+
+    for (side, _), break_group in zip(sides, breaks):
+        packed_groups.extend(side)
+        packed_groups.append(break_group)
+
+    packed_groups.extend(leftover)
+    mix.replace_groups(packed_groups)
+
+    return [unused for _, unused in sides], sum(len(group) for group in leftover)
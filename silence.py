@@ -0,0 +1,70 @@
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+from pcm import stream_pcm
+from filecache import map_cached
+
+ANALYSIS_SAMPLE_RATE = 12000
+WINDOW_SECONDS = 0.05
+SILENCE_THRESHOLD = -50.0
+FADE_DEPTH = 20.0
+REFERENCE_PERCENTILE = 95
+WINDOWS_PER_CHUNK = 200
+
+def window_levels(samples: np.ndarray, window_length: int):
+    windows = len(samples) // window_length
+    frames = samples[:windows * window_length].reshape(windows, window_length)
+
+    with np.errstate(divide="ignore"):
+        return 10 * np.log10(np.mean(frames * frames, axis=1))
+
+def measure_levels(chunks, sample_rate: int = ANALYSIS_SAMPLE_RATE):
+    window_length = int(sample_rate * WINDOW_SECONDS)
+    levels = []
+    frames = 0
+
+    for chunk in chunks:
+        levels.append(window_levels(chunk[:, 0], window_length))
+        frames += len(chunk)
+
+    return np.concatenate(levels) if levels else np.empty(0), frames / sample_rate
+
+def audio_bounds(levels: np.ndarray, duration: float):
+    audible = np.flatnonzero(levels > SILENCE_THRESHOLD)
+
+    if len(audible) <= 0:
+        return {"start": 0.0, "end": duration, "fade_in": 0.0, "fade_out": duration, "duration": duration}
+
+    first, last = int(audible[0]), int(audible[-1])
+
+    reference = np.percentile(levels[first:last + 1], REFERENCE_PERCENTILE)
+    loud = np.flatnonzero(levels[first:last + 1] >= reference - FADE_DEPTH) + first
+
+    return {
+        "start": first * WINDOW_SECONDS,
+        "end": min(duration, (last + 1) * WINDOW_SECONDS),
+        "fade_in": int(loud[0]) * WINDOW_SECONDS,
+        "fade_out": min(duration, (int(loud[-1]) + 1) * WINDOW_SECONDS),
+        "duration": duration
+    }
+
+def analyse_silence(path: Path):
+    chunk_frames = int(ANALYSIS_SAMPLE_RATE * WINDOW_SECONDS) * WINDOWS_PER_CHUNK
+    return audio_bounds(*measure_levels(stream_pcm(path, sample_rate=ANALYSIS_SAMPLE_RATE, channels=1, chunk_frames=chunk_frames)))
+
+def try_analyse_silence(path: Path):
+    try:
+        return analyse_silence(path)
+    except (subprocess.CalledProcessError, ValueError, OSError):
+        return None
+
+def index_silence(paths: list[Path], cache_path: Path, workers: int = 1):
+    return map_cached(paths, cache_path, "silence", try_analyse_silence, workers=workers, desc="Finding silence")
+
+def trimmed_length(bounds, length: float):
+    if bounds is None:
+        return length
+
+    return max(0.0, length - bounds["start"] - max(0.0, bounds["duration"] - bounds["end"]))
@@ -0,0 +1,62 @@
+from encodemanifest import MANIFEST_FILENAME, ConversionManifest
+
+def test_records_survive_reload(tmp_path):
+    source = tmp_path / "source.flac"
+    source.write_bytes(b"audio")
+    output = tmp_path / "out" / "Artist" / "song.mp3"
+    output.parent.mkdir(parents=True)
+    output.write_bytes(b"mp3")
+
+    manifest = ConversionManifest(tmp_path / "out")
+    assert not manifest.is_current(output, source, source.stat(), "320k")
+
+    manifest.record(output, source, source.stat(), "320k")
+    manifest.save()
+
+    reloaded = ConversionManifest(tmp_path / "out")
+    assert reloaded.is_current(output, source, source.stat(), "320k")
+    assert not reloaded.is_current(output, source, source.stat(), "V0")
+    assert not reloaded.is_current(output, tmp_path / "other.flac", source.stat(), "320k")
+
+    source.write_bytes(b"changed audio")
+    assert not reloaded.is_current(output, source, source.stat(), "320k")
+
+def test_missing_output_is_not_current(tmp_path):
+    source = tmp_path / "source.flac"
+    source.write_bytes(b"audio")
+
+    manifest = ConversionManifest(tmp_path)
+    manifest.record(tmp_path / "song.mp3", source, source.stat(), "320k")
+
+    assert not manifest.is_current(tmp_path / "song.mp3", source, source.stat(), "320k")
+
+def test_unreadable_manifest_starts_empty(tmp_path):
+    (tmp_path / MANIFEST_FILENAME).write_text("{not json", encoding="utf-8")
+    assert ConversionManifest(tmp_path).entries == {}
+
+    (tmp_path / MANIFEST_FILENAME).write_text('{"version": 0, "entries": {"a.mp3": {}}}', encoding="utf-8")
+    assert ConversionManifest(tmp_path).entries == {}
+
+def test_prune_removes_stale_outputs_and_empty_folders(tmp_path):
+    source = tmp_path / "source.flac"
+    source.write_bytes(b"audio")
+    destination = tmp_path / "out"
+
+    manifest = ConversionManifest(destination)
+    outputs = [destination / "A" / "B" / "old.mp3", destination / "A" / "kept.mp3", destination / "C" / "gone.mp3"]
+
+    for output in outputs[:2]:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_bytes(b"mp3")
+
+    for output in outputs:
+        manifest.record(output, source, source.stat(), "320k")
+
+    assert manifest.prune({"A/kept.mp3"}) == 1
+    assert list(manifest.entries) == ["A/kept.mp3"]
+    assert not (destination / "A" / "B").exists()
+    assert (destination / "A" / "kept.mp3").is_file()
+    assert destination.is_dir()
+
+    manifest.save()
+    assert sorted(path.name for path in destination.iterdir()) == sorted(["A", MANIFEST_FILENAME])
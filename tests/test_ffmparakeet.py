@@ -0,0 +1,61 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+import exportmix
+import ffmparakeet
+from jobdata import ExportJob
+
+def failing_batch(command, check):
+    raise subprocess.CalledProcessError(1, command)
+
+def fake_run_ffmpeg(source, destination, *args):
+    if source.name == "broken.flac":
+        raise OSError("disk full")
+
+    if source.name == "bad.flac":
+        raise subprocess.CalledProcessError(1, ["ffmpeg"])
+
+    return destination
+
+def test_batch_fallback_converts_the_rest_after_any_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(ffmparakeet.subprocess, "run", failing_batch)
+    monkeypatch.setattr(ffmparakeet, "run_ffmpeg", fake_run_ffmpeg)
+
+    files = [(Path(f"/music/{name}.flac"), tmp_path / f"{name}.mp3") for name in ("a", "broken", "bad", "b")]
+    results = ffmparakeet.run_ffmpeg_batch(files)
+
+    assert [output for output, _ in results] == [tmp_path / "a.mp3", None, None, tmp_path / "b.mp3"]
+    assert isinstance(results[1][1], OSError)
+    assert isinstance(results[2][1], subprocess.CalledProcessError)
+    assert results[0][1] is None and results[3][1] is None
+
+def test_batch_falls_back_when_preparing_an_output_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(ffmparakeet, "run_ffmpeg", fake_run_ffmpeg)
+    (tmp_path / "file").write_bytes(b"")
+
+    files = [(Path("/music/a.flac"), tmp_path / "a.mp3"), (Path("/music/b.flac"), tmp_path / "file" / "b.mp3")]
+
+    assert ffmparakeet.run_ffmpeg_batch(files) == [(tmp_path / "a.mp3", None), (tmp_path / "file" / "b.mp3", None)]
+
+def test_batch_without_fallback_raises(tmp_path, monkeypatch):
+    monkeypatch.setattr(ffmparakeet.subprocess, "run", failing_batch)
+
+    with pytest.raises(subprocess.CalledProcessError):
+        ffmparakeet.run_ffmpeg_batch([(Path("/music/a.flac"), tmp_path / "a.mp3")], fallback=False)
+
+def test_export_batch_retries_jobs_one_by_one(monkeypatch):
+    def failing_export_batch(*args, **kwargs):
+        raise OSError("argument list too long")
+
+    def export(job):
+        if job.source_path.name == "broken.flac":
+            raise OSError("disk full")
+
+    monkeypatch.setattr(exportmix, "run_ffmpeg_batch", failing_export_batch)
+
+    batch = tuple(ExportJob(Path(f"/music/{name}.flac"), Path(f"/mix/{name}.mp3"), track_num, "Mix") for track_num, name in enumerate(("a", "broken", "b")))
+    results = exportmix.run_export_batch(batch, export, retries=1)
+
+    assert results == [(batch[0], None), (batch[1], "OSError: disk full"), (batch[2], None)]
@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from filecache import CACHE_FILENAME, default_cache_path, map_cached
+
+@pytest.mark.skipif(sys.platform in ("win32", "darwin"), reason="XDG_CACHE_HOME is only read on Linux")
+def test_cache_lives_in_the_user_cache_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+    assert default_cache_path() == tmp_path / "cache" / "MParakeet" / CACHE_FILENAME
+    assert default_cache_path().parent.is_dir()
+
+def test_results_are_reused_across_working_directories(tmp_path, monkeypatch):
+    (tmp_path / "music").mkdir()
+    (tmp_path / "music" / "song.mp3").write_bytes(b"audio")
+    (tmp_path / "other").mkdir()
+    (tmp_path / "other" / "song.mp3").write_bytes(b"other audio")
+    cache_path = tmp_path / CACHE_FILENAME
+    calls = []
+
+    def analyse(path):
+        calls.append(path)
+        return path.read_bytes().decode()
+
+    monkeypatch.chdir(tmp_path / "music")
+    assert map_cached([tmp_path / "music" / "song.mp3"], cache_path, "test", analyse)[tmp_path / "music" / "song.mp3"] == "audio"
+    assert map_cached([Path("song.mp3")], cache_path, "test", analyse)[Path("song.mp3")] == "audio"
+
+    monkeypatch.chdir(tmp_path / "other")
+    assert map_cached([Path("song.mp3")], cache_path, "test", analyse)[Path("song.mp3")] == "other audio"
+    assert len(calls) == 2
@@ -0,0 +1,111 @@
+import random
+
+from grouptree import GroupTree
+
+def measure(group):
+    return len(group), sum(group), 1 if len(group) > 1 else 0
+
+def summed(groups):
+    return tuple(map(sum, zip(*map(measure, groups)))) if groups else measure([])
+
+def locate(groups, track_index):
+    for group_index, group in enumerate(groups):
+        if track_index < len(group):
+            return group_index, track_index
+
+        track_index -= len(group)
+
+    return -1, -1
+
+def check(tree, groups):
+    assert list(tree) == groups
+    assert len(tree) == len(groups)
+    assert tree.track_count() == sum(map(len, groups))
+    assert tree.summary() == summed(groups)
+
+    for group_index in range(len(groups) + 1):
+        assert tree.prefix(group_index) == summed(groups[:group_index])
+        assert tree.group_start(group_index) == sum(map(len, groups[:group_index]))
+
+    for group_index in range(len(groups)):
+        assert tree[group_index] == groups[group_index]
+        assert list(tree.iter_from(group_index)) == groups[group_index:]
+
+    tracks = [track for group in groups for track in group]
+
+    for track_index, track in enumerate(tracks):
+        assert tree.locate(track_index) == locate(groups, track_index)
+        assert tree.track_at(track_index) == track
+
+    assert tree.locate(len(tracks)) == (-1, -1)
+
+    for rank in range(sum(len(group) > 1 for group in groups) + 1):
+        expected = next((group_index for group_index in range(len(groups)) if summed(groups[:group_index + 1])[2] > rank), -1)
+        assert tree.select(2, rank) == expected
+
+def test_matches_plain_list():
+    rng = random.Random(7)
+    tree = GroupTree(measure=measure)
+    groups = []
+
+    for step in range(400):
+        operation = rng.random()
+
+        if operation < 0.35 or len(groups) <= 0:
+            group_index = rng.randint(0, len(groups))
+            group = [rng.randint(1, 100) for _ in range(rng.randint(1, 3))]
+
+            tree.insert(group_index, list(group))
+            groups.insert(group_index, group)
+        elif operation < 0.5:
+            group_index = rng.randrange(len(groups))
+
+            assert tree.pop(group_index) == groups.pop(group_index)
+        elif operation < 0.65:
+            group_index = rng.randrange(len(groups))
+            local_index = rng.randint(0, len(groups[group_index]))
+            track = rng.randint(1, 100)
+
+            tree.insert_track(group_index, local_index, track)
+            groups[group_index].insert(local_index, track)
+        elif operation < 0.8:
+            group_index = rng.randrange(len(groups))
+            local_index = rng.randrange(len(groups[group_index]))
+            track = rng.randint(1, 100)
+
+            tree.set_track(group_index, local_index, track)
+            groups[group_index][local_index] = track
+        else:
+            group_index = rng.randrange(len(groups))
+            local_index = rng.randrange(len(groups[group_index]))
+
+            tree.remove_track(group_index, local_index)
+            del groups[group_index][local_index]
+
+            if len(groups[group_index]) <= 0:
+                del groups[group_index]
+
+        if step % 20 == 0:
+            check(tree, groups)
+
+    check(tree, groups)
+
+def test_remeasure_uses_new_measure():
+    tree = GroupTree(measure=measure)
+
+    for group_index in range(50):
+        tree.insert(group_index, [group_index, 1])
+
+    tree.measure = lambda group: (len(group), sum(group) * 2, 0)
+    tree.remeasure()
+
+    assert tree.summary() == (100, sum(group_index + 1 for group_index in range(50)) * 2, 0)
+    assert tree.prefix(10) == (20, sum(group_index + 1 for group_index in range(10)) * 2, 0)
+
+def test_empty_tree():
+    tree = GroupTree(measure=measure)
+
+    assert list(tree) == []
+    assert tree.summary() == (0, 0, 0)
+    assert tree.select(2, 0) == -1
+    assert tree.locate(0) == (-1, -1)
@@ -0,0 +1,86 @@
+import math
+
+import numpy as np
+import pytest
+
+from loudness import HIGH_PASS, SHELF, integrated_loudness, measure_loudness, normalization_gain
+
+SAMPLE_RATE = 48000
+
+def sine(level: float, seconds: float, frequency: float = 1000.0, channels: int = 2):
+    times = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    samples = 10 ** (level / 20) * np.sin(2 * np.pi * frequency * times)
+
+    return np.repeat(samples[:, None], channels, axis=1).astype(np.float32)
+
+def biquad(coefficients, samples):
+    (b0, b1, b2), (_, a1, a2) = coefficients
+    output = []
+    x1 = x2 = y1 = y2 = 0.0
+
+    for x in samples.tolist():
+        y = b0 * x + b1 * x1 + b2 * x2 - a1 * y1 - a2 * y2
+        x1, x2, y1, y2 = x, x1, y, y1
+        output.append(y)
+
+    return np.array(output)
+
+def reference_loudness(samples: np.ndarray):
+    weighted = np.stack([biquad(HIGH_PASS, biquad(SHELF, samples[:, channel])) for channel in range(samples.shape[1])], axis=1)
+
+    block, step = int(0.4 * SAMPLE_RATE), int(0.1 * SAMPLE_RATE)
+    blocks = np.array([np.mean(weighted[start:start + block] ** 2, axis=0).sum() for start in range(0, len(weighted) - block + 1, step)])
+
+    gated = blocks[-0.691 + 10 * np.log10(blocks) > -70]
+    gated = gated[-0.691 + 10 * np.log10(gated) > -0.691 + 10 * np.log10(gated.mean()) - 10]
+
+    return -0.691 + 10 * np.log10(gated.mean())
+
+@pytest.mark.parametrize("parts, expected", [
+    ([(-23, 20)], -23.0),
+    ([(-33, 20)], -33.0),
+    ([(-36, 10), (-23, 60), (-36, 10)], -23.0),
+    ([(-72, 10), (-36, 10), (-23, 60), (-36, 10), (-72, 10)], -23.0),
+    ([(-26, 20), (-20, 20.1), (-26, 20)], -23.0),
+])
+def test_ebu_reference_signals(parts, expected):
+    samples = np.concatenate([sine(level, seconds) for level, seconds in parts])
+
+    assert integrated_loudness(samples, SAMPLE_RATE) == pytest.approx(expected, abs=0.1)
+
+@pytest.mark.parametrize("seed", range(3))
+def test_matches_time_domain_filter(seed):
+    rng = np.random.default_rng(seed)
+    samples = rng.normal(0, 0.1, (3 * SAMPLE_RATE, 2)) * np.linspace(0.05, 1, 3 * SAMPLE_RATE)[:, None]
+    samples[:, 1] += 0.2 * np.sin(2 * np.pi * rng.uniform(40, 12000) * np.arange(len(samples)) / SAMPLE_RATE)
+
+    assert integrated_loudness(samples.astype(np.float32), SAMPLE_RATE) == pytest.approx(reference_loudness(samples), abs=0.01)
+
+def test_chunked_measurement_matches_whole_signal():
+    rng = np.random.default_rng(1)
+    samples = (rng.normal(0, 0.1, (7 * SAMPLE_RATE, 2)) * np.linspace(0, 1, 7 * SAMPLE_RATE)[:, None]).astype(np.float32)
+    whole = measure_loudness([samples], SAMPLE_RATE)
+    chunked = measure_loudness(np.split(samples, [4800, 96000, 96000 + 4800 * 7]), SAMPLE_RATE)
+
+    assert chunked["integrated"] == pytest.approx(whole["integrated"], abs=1e-6)
+    assert chunked["peak"] == pytest.approx(whole["peak"])
+    assert chunked["duration"] == whole["duration"] == 7.0
+
+def test_silence_and_short_signals_have_no_loudness():
+    assert measure_loudness([np.zeros((5 * SAMPLE_RATE, 2), dtype=np.float32)], SAMPLE_RATE) == {"integrated": None, "peak": None, "duration": 5.0}
+    assert integrated_loudness(sine(-20, 0.3), SAMPLE_RATE) is None
+    assert measure_loudness([], SAMPLE_RATE)["integrated"] is None
+
+def test_peak():
+    result = measure_loudness([sine(-6, 1)], SAMPLE_RATE)
+
+    assert result["peak"] == pytest.approx(-6, abs=0.01)
+
+def test_normalization_gain():
+    assert normalization_gain(None) is None
+    assert normalization_gain({"integrated": None, "peak": None}) is None
+    assert normalization_gain({"integrated": -20.0, "peak": -10.0}) == 6.0
+    assert normalization_gain({"integrated": -20.0, "peak": -4.0}) == 3.0
+    assert normalization_gain({"integrated": -8.0, "peak": -0.5}, target=-23) == -15.0
+    assert normalization_gain({"integrated": -20.0, "peak": None}, target=-16) == 4.0
+    assert math.isclose(normalization_gain({"integrated": -20.123, "peak": -30.0}), 6.12)
@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from mix import Mix, parse_break_cutoff, side_name
+from track import Track
+
+@pytest.mark.parametrize("track_break, cutoff", [
+    (".break 45", 45),
+    (".break 45:30", 2730),
+    (".break 1:30", 90),
+    (".break 0:59", 59),
+    (".break 1:02:03", 3723),
+])
+def test_parse_break_cutoff(track_break, cutoff):
+    assert parse_break_cutoff(track_break) == cutoff
+
+def test_side_names():
+    assert [side_name(section_num) for section_num in (0, 1, 25, 26, 27, 51, 52, 701, 702)] == ["A", "B", "Z", "AA", "AB", "AZ", "BA", "ZZ", "AAA"]
+
+def side_lines(mix, page_size, capsys):
+    mix.page_size = page_size
+    capsys.readouterr()
+
+    for page in range(mix.page_count()):
+        mix.display(page)
+
+    return [line for line in capsys.readouterr().out.splitlines() if "Side" in line]
+
+@pytest.mark.parametrize("seed", range(5))
+def test_paged_display_matches_full_display(seed, capsys):
+    rng = random.Random(seed)
+    mix = Mix("Test mix")
+
+    for track_index in range(300):
+        if rng.random() < 0.05:
+            mix.add_track_or_break(".break 45:00")
+        else:
+            mix.add_track_or_break(Track(f"Track {track_index}", f"/music/{track_index}.mp3", round(rng.uniform(100, 400), 1)))
+
+    full = side_lines(mix, None, capsys)
+
+    for page_size in (3, 7, 13, 50):
+        assert side_lines(mix, page_size, capsys) == full
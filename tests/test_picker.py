@@ -0,0 +1,12 @@
+import pytest
+
+from picker import fzf_action
+
+def test_fzf_action_picks_a_free_delimiter():
+    assert fzf_action("execute", "helper {+f}") == "execute(helper {+f})"
+    assert fzf_action("execute", "'C:/Program Files (x86)/python.exe' helper {+f}") == "execute['C:/Program Files (x86)/python.exe' helper {+f}]"
+    assert fzf_action("reload-sync", "cat '/tmp/a (1) [2].txt'") == "reload-sync<cat '/tmp/a (1) [2].txt'>"
+
+def test_fzf_action_without_a_free_delimiter():
+    with pytest.raises(ValueError):
+        fzf_action("execute", "()[]<>~!@#%^&*;|")
@@ -0,0 +1,76 @@
+import random
+import itertools
+
+from mix import Mix
+from track import Track
+from sidepacker import best_subset, pack_sides, pack_mix
+
+def brute_force(lengths, capacities):
+    best = 0
+
+    for assignment in itertools.product(range(-1, len(capacities)), repeat=len(lengths)):
+        loads = [0] * len(capacities)
+
+        for length, side in zip(lengths, assignment):
+            if side >= 0:
+                loads[side] += length
+
+        if all(load <= capacity for load, capacity in zip(loads, capacities)):
+            best = max(best, sum(loads))
+
+    return best
+
+def test_best_subset():
+    assert best_subset([5, 3, 4, 2], 9) == (9, [0, 2])
+    assert best_subset([10], 5) == (0, [])
+    assert best_subset([], 5) == (0, [])
+
+def test_pack_sides_fills_across_sides():
+    sides, leftover = pack_sides([0, 1, 2], [3, 9, 10], [12, 9])
+
+    assert sides == [([2], 2), ([1], 0)]
+    assert leftover == [0]
+
+def test_pack_sides_matches_brute_force():
+    rng = random.Random(0)
+
+    for _ in range(500):
+        lengths = [rng.randint(1, 20) for _ in range(rng.randint(0, 6))]
+        capacities = [rng.randint(5, 30) for _ in range(rng.randint(1, 3))]
+
+        sides, leftover = pack_sides(list(range(len(lengths))), lengths, capacities)
+        loads = [sum(lengths[unit] for unit in side) for side, _ in sides]
+
+        assert all(load <= capacity for load, capacity in zip(loads, capacities))
+        assert sum(loads) == brute_force(lengths, capacities)
+        assert sorted([unit for side, _ in sides for unit in side] + leftover) == list(range(len(lengths)))
+
+def test_pack_mix_keeps_groups_together():
+    mix = Mix(mix_title="test")
+    mix.confirm_group_insert = lambda move_track, move_to_track: True
+
+    for index, length in enumerate([100, 50, 120, 80, 70]):
+        mix.add_track_or_break(Track(title=f"t{index}", path=f"/t{index}.mp3", length=length))
+
+    mix.add_track_or_break(".break 3:20")
+    mix.add_track_or_break(".break 3:20")
+    mix.group_tracks(0, 1)
+
+    assert pack_mix(mix) == ([0, 50], 1)
+
+    groups = [[track.title for track in group] if isinstance(group[0], Track) else group for group in mix.track_groups]
+
+    assert groups == [["t2"], ["t3"], [".break 3:20"], ["t1", "t0"], [".break 3:20"], ["t4"]]
+
+def test_pack_mix_measures_tracks_like_the_display(capsys):
+    mix = Mix(mix_title="test")
+    mix.replace_groups([[Track(title=f"t{index}", path=f"/t{index}.mp3", length=10.6) for index in range(3)], [".break 32"]])
+
+    assert pack_mix(mix) == ([32], 3)
+
+    capsys.readouterr()
+    mix.display()
+    side_lines = [line for line in capsys.readouterr().out.splitlines() if "Side" in line]
+
+    assert len(side_lines) == 1
+    assert "+" not in side_lines[0]
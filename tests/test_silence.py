@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from silence import ANALYSIS_SAMPLE_RATE, audio_bounds, measure_levels, trimmed_length, window_levels
+
+def tone(level: float, seconds: float):
+    times = np.arange(int(seconds * ANALYSIS_SAMPLE_RATE)) / ANALYSIS_SAMPLE_RATE
+    return (10 ** (level / 20) * np.sin(2 * np.pi * 440 * times)).astype(np.float32)[:, None]
+
+def silence(seconds: float):
+    return np.zeros((int(seconds * ANALYSIS_SAMPLE_RATE), 1), dtype=np.float32)
+
+def bounds(*parts, chunk_frames=ANALYSIS_SAMPLE_RATE):
+    samples = np.concatenate(parts)
+    return audio_bounds(*measure_levels(np.split(samples, range(chunk_frames, len(samples), chunk_frames)), ANALYSIS_SAMPLE_RATE))
+
+def test_window_levels():
+    levels = window_levels(np.concatenate([np.zeros(600), np.full(600, 0.5), np.ones(100)]), 600)
+
+    assert len(levels) == 2
+    assert levels[0] == -np.inf
+    assert levels[1] == pytest.approx(20 * np.log10(0.5))
+
+def test_trims_leading_and_trailing_silence():
+    result = bounds(silence(1.5), tone(-10, 3), silence(2))
+
+    assert result["start"] == pytest.approx(1.5)
+    assert result["end"] == pytest.approx(4.5)
+    assert result["fade_in"] == pytest.approx(1.5)
+    assert result["fade_out"] == pytest.approx(4.5)
+    assert result["duration"] == pytest.approx(6.5)
+
+def test_quiet_fades_are_kept_but_marked():
+    result = bounds(silence(1), tone(-45, 2), tone(-10, 3), tone(-45, 1), silence(1))
+
+    assert result["start"] == pytest.approx(1)
+    assert result["fade_in"] == pytest.approx(3)
+    assert result["fade_out"] == pytest.approx(6)
+    assert result["end"] == pytest.approx(7)
+
+def test_noise_below_threshold_is_silence():
+    result = bounds(tone(-60, 1), tone(-10, 1), tone(-60, 1))
+
+    assert result["start"] == pytest.approx(1)
+    assert result["end"] == pytest.approx(2)
+
+def test_chunking_does_not_move_bounds():
+    parts = (silence(1.23), tone(-10, 2.5), silence(0.8))
+
+    assert bounds(*parts, chunk_frames=600 * 7) == bounds(*parts)
+
+def test_silent_file_is_not_trimmed():
+    result = bounds(silence(3))
+
+    assert (result["start"], result["end"]) == (0.0, pytest.approx(3))
+    assert audio_bounds(*measure_levels([], ANALYSIS_SAMPLE_RATE))["end"] == 0
+
+def test_trimmed_length():
+    assert trimmed_length(None, 200.0) == 200.0
+    assert trimmed_length({"start": 1.5, "end": 195.0, "duration": 200.0}, 200.0) == pytest.approx(193.5)
+    assert trimmed_length({"start": 1.5, "end": 195.0, "duration": 200.0}, 201.0) == pytest.approx(194.5)
+    assert trimmed_length({"start": 5.0, "end": 4.0, "duration": 200.0}, 3.0) == 0.0
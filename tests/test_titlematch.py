@@ -0,0 +1,43 @@
+import random
+from difflib import SequenceMatcher
+
+from titlematch import TitleIndex, normalize_title, trigrams
+from track import Track
+
+WORDS = "love night city dream fire heart blue rain summer dance light road star song wild gold river shadow storm moon".split()
+
+def make_tracks(rng, count):
+    return [Track(" ".join(rng.choice(WORDS).title() for _ in range(rng.randint(1, 4))) + f" {index}", f"/music/{index}.mp3", 200) for index in range(count)]
+
+def test_normalize_title():
+    assert normalize_title("  Blue   RAIN\tSong ") == "blue rain song"
+    assert trigrams("ab") == {"  a", " ab", "ab "}
+
+def test_exact_title_wins():
+    tracks = [Track("Blue Rain", "/a.mp3", 100), Track("Blue Rain (Remix)", "/b.mp3", 100), Track("Red Rain", "/c.mp3", 100)]
+
+    assert TitleIndex(tracks).match("Blue Rain") == (tracks[0], 1.0)
+
+def test_query_without_shared_trigrams_scans_everything():
+    tracks = [Track("abc", "/a.mp3", 100), Track("xyz", "/b.mp3", 100)]
+    index = TitleIndex(tracks)
+
+    assert list(index.candidates("")) == [0, 1]
+    assert index.match("") == (None, 0)
+
+def test_matches_full_scan():
+    rng = random.Random(3)
+    tracks = make_tracks(rng, 500)
+    index = TitleIndex(tracks)
+
+    for _ in range(60):
+        query = list(rng.choice(tracks).title)
+
+        for _ in range(rng.randint(0, 3)):
+            query[rng.randrange(len(query))] = rng.choice("abcdefghijklmnopqrstuvwxyz ")
+
+        query = "".join(query)
+        track, ratio = index.match(query)
+
+        assert ratio == max(SequenceMatcher(None, candidate.title, query).ratio() for candidate in tracks)
+        assert SequenceMatcher(None, track.title, query).ratio() == ratio
@@ -0,0 +1,67 @@
+import heapq
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+from track import Track
+
+CANDIDATE_LIMIT = 64
+LOW_CONFIDENCE = 0.6
+
+def normalize_title(title: str):
+    return " ".join(title.casefold().split())
+
+def trigrams(text: str):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TitleIndex:
+    def __init__(self, tracks: list[Track], candidate_limit: int = CANDIDATE_LIMIT):
+        self.tracks = tracks
+        self.candidate_limit = candidate_limit
+        self.postings: defaultdict[str, list[int]] = defaultdict(list)
+        self.gram_counts: list[int] = []
+
+        for position, track in enumerate(tracks):
+            grams = trigrams(normalize_title(track.title))
+            self.gram_counts.append(len(grams))
+
+            for gram in grams:
+                self.postings[gram].append(position)
+
+    def candidates(self, query: str):
+        grams = trigrams(normalize_title(query))
+
+        shared = Counter()
+
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+
+        if len(shared) <= 0:
+            return range(len(self.tracks))
+
+        def similarity(item):
+            position, count = item
+            return count / (len(grams) + self.gram_counts[position] - count)
+
+        return sorted(position for position, _ in heapq.nlargest(self.candidate_limit, shared.items(), key=similarity))
+
+    def match(self, query: str):
+        track = None
+        best_match = 0
+
+        matcher = SequenceMatcher(None, b=query)
+
+        for position in self.candidates(query):
+            candidate = self.tracks[position]
+            matcher.set_seq1(candidate.title)
+
+            if matcher.real_quick_ratio() <= best_match or matcher.quick_ratio() <= best_match:
+                continue
+
+            match_ratio = matcher.ratio()
+
+            if match_ratio > best_match:
+                best_match = match_ratio
+                track = candidate
+
+        return track, best_match
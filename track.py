@@ -0,0 +1,7 @@
+from dataclasses import dataclass
+
+@dataclass(frozen=True, slots=True)
+class Track:
+    title: str
+    path: str
+    length: float
@@ -0,0 +1,88 @@
+import hashlib
+from pathlib import Path
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from tqdm import tqdm
+from mutagen.mp3 import MP3
+from mutagen.easyid3 import EasyID3
+
+from ottlog import logger
+from metrics import metrics
+
+AUDIO_SUFFIXES = (".mp3",)
+
+def is_audio_file(path: str):
+    return path.lower().endswith(AUDIO_SUFFIXES)
+
+def find_audio_files(directory: Path):
+    return [file for suffix in AUDIO_SUFFIXES for file in directory.rglob(f"*{suffix}", case_sensitive=False) if file.is_file()]
+
+def read_track_info(path: Path):
+    audio_file = MP3(path, ID3=EasyID3)
+    title = audio_file.get('Title', [path.stem])[0]
+
+    return title, audio_file.info.length
+
+def read_mix_track_info(path: Path):
+    audio_file = MP3(path, ID3=EasyID3)
+    title = audio_file.get('Title', [path.stem])[0]
+
+    try:
+        track_number = int(audio_file.get('TrackNumber', [""])[0].split("/")[0])
+    except ValueError:
+        track_number = None
+
+    return title, audio_file.info.length, track_number
+
+def audio_fingerprint(path: Path, sample_size: int = 1 << 16):
+    with open(path, "rb") as file:
+        header = file.read(10)
+        audio_start = 0
+
+        if len(header) == 10 and header[:3] == b"ID3":
+            tag_size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+            audio_start = 10 + tag_size + (10 if header[5] & 0x10 else 0)
+
+        audio_end = path.stat().st_size
+
+        if audio_end - audio_start >= 128:
+            file.seek(audio_end - 128)
+
+            if file.read(3) == b"TAG":
+                audio_end -= 128
+
+        file.seek(audio_start)
+
+        return hashlib.blake2b(file.read(max(0, min(sample_size, audio_end - audio_start))), digest_size=16).hexdigest()
+
+def try_read_track_info(reader, path: str):
+    try:
+        return reader(Path(path)), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def scan_tracks(paths: list[str], workers: int = 1, reader=read_track_info, desc="Scanning library"):
+    progress = dict(total=len(paths), desc=desc, unit="file", ncols=100, disable=len(paths) <= 0)
+    try_read = partial(try_read_track_info, reader)
+
+    if workers > 1 and len(paths) > 1:
+        chunksize = max(1, min(256, len(paths) // (workers * 4)))
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(tqdm(executor.map(try_read, paths, chunksize=chunksize), **progress))
+    else:
+        results = [try_read(path) for path in tqdm(paths, **progress)]
+
+    metrics.increment("scanned_files", len(paths))
+
+    track_infos = []
+
+    for path, (track_info, error) in zip(paths, results):
+        if error is not None:
+            logger.warning(f"Skipping unreadable file {path}: {error}")
+            metrics.increment("scan_failures")
+
+        track_infos.append(track_info)
+
+    return track_infos
@@ -0,0 +1,227 @@
+import os
+import time
+import errno
+import ctypes
+import select
+import struct
+import threading
+import ctypes.util
+from pathlib import Path
+
+from ottlog import logger
+from trackscan import is_audio_file
+
+DEBOUNCE_SECONDS = 2.0
+MAX_DELAY_SECONDS = 30.0
+POLL_INTERVAL_SECONDS = 5.0
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+def snapshot(root: Path):
+    files = {}
+
+    for directory, _, file_names in os.walk(root):
+        for file_name in file_names:
+            if is_audio_file(file_name):
+                path = os.path.join(directory, file_name)
+
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                files[path] = (stat.st_mtime_ns, stat.st_size)
+
+    return files
+
+class Inotify:
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+
+        if libc_name is None:
+            raise OSError("libc was not found")
+
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.directories = {}
+
+    def add_watch(self, directory: str):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+
+        self.directories[wd] = directory
+
+    def add_tree(self, root: str):
+        for directory, _, _ in os.walk(root):
+            try:
+                self.add_watch(directory)
+            except OSError as e:
+                if e.errno not in (errno.ENOENT, errno.ENOTDIR):
+                    raise
+
+    def read_events(self, timeout: float):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+
+        if not readable:
+            return []
+
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_IGNORED:
+                self.directories.pop(wd, None)
+                continue
+
+            directory = self.directories.get(wd)
+            events.append((mask, os.path.join(directory, name) if directory is not None and name else directory))
+
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+class LibraryWatcher:
+    def __init__(self, root: Path, debounce: float = DEBOUNCE_SECONDS, poll_interval: float = POLL_INTERVAL_SECONDS):
+        self.root = str(root.resolve())
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.first_event = None
+        self.last_event = None
+        self.stopped = threading.Event()
+        self.inotify = None
+
+        try:
+            self.inotify = Inotify()
+            self.inotify.add_tree(self.root)
+            self.mode = "inotify"
+        except (OSError, AttributeError) as e:
+            self.fall_back_to_polling(e)
+
+        self.thread = threading.Thread(target=self.run, name="LibraryWatcher", daemon=True)
+        self.thread.start()
+
+    def fall_back_to_polling(self, error):
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+
+        logger.info(f"Falling back to polling {self.root} every {self.poll_interval:g}s ({error})")
+        self.files = snapshot(Path(self.root))
+        self.mode = "polling"
+
+    def add_pending(self, paths):
+        if len(paths) <= 0:
+            return
+
+        now = time.monotonic()
+
+        with self.lock:
+            self.pending.update(paths)
+            self.first_event = now if self.first_event is None else self.first_event
+            self.last_event = now
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                if self.inotify is not None:
+                    changed, directories = self.handle_events(self.inotify.read_events(timeout=0.5))
+                    self.add_pending(changed)
+
+                    for directory in directories:
+                        self.inotify.add_tree(directory)
+                else:
+                    self.stopped.wait(self.poll_interval)
+                    self.add_pending(self.poll())
+            except Exception as e:
+                if self.inotify is not None:
+                    self.fall_back_to_polling(e)
+                else:
+                    logger.exception(f"Polling {self.root} failed")
+
+    def handle_events(self, events):
+        changed = set()
+        directories = []
+
+        for mask, path in events:
+            if mask & IN_Q_OVERFLOW:
+                changed.add(self.root + os.sep)
+            elif path is None:
+                continue
+            elif mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    directories.append(path)
+
+                if mask & (IN_CREATE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE):
+                    changed.add(path + os.sep)
+            elif is_audio_file(path) and mask & (IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE):
+                changed.add(path)
+
+        return changed, directories
+
+    def poll(self):
+        files = snapshot(Path(self.root))
+        changed = {path for path, signature in files.items() if self.files.get(path) != signature}
+        changed.update(path for path in self.files if path not in files)
+        self.files = files
+
+        return changed
+
+    def drain(self):
+        now = time.monotonic()
+
+        with self.lock:
+            if len(self.pending) <= 0:
+                return set()
+
+            if now - self.last_event < self.debounce and now - self.first_event < MAX_DELAY_SECONDS:
+                return set()
+
+            pending = self.pending
+            self.pending = set()
+            self.first_event = None
+            self.last_event = None
+
+        return pending
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+        if self.inotify is not None:
+            self.inotify.close()